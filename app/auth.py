@@ -2,7 +2,12 @@
 from fastapi import HTTPException, Security, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
+import hmac
 import os
+from hashlib import sha256
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional, Literal, Annotated
 
 # ---------------------------------------------------------
@@ -26,6 +31,10 @@ def get_role_level(role: str) -> int:
 SECRET = os.getenv("JWT_SECRET", "change_this_secret")
 security = HTTPBearer()
 
+# Cache de tokens ya verificados (clave = token crudo)
+JWT_CACHE_MAXSIZE = int(os.getenv("JWT_CACHE_MAXSIZE", "4096"))
+JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "300"))   # tokens sin `exp`
+
 
 # ---------------------------------------------------------
 # 1. MANEJO DE TOKENS
@@ -35,6 +44,16 @@ def create_token(payload: dict) -> str:
     return jwt.encode(payload, SECRET, algorithm="HS256")
 
 
+def hash_password(clave: str) -> str:
+    """Hash con el que USUARIO.contrasena guarda las claves (SHA-256 hex)."""
+    return sha256(clave.encode()).hexdigest()
+
+
+def verify_password(clave: str, clave_hash: str) -> bool:
+    """Compara en tiempo constante la clave contra el hash guardado."""
+    return hmac.compare_digest(hash_password(clave), clave_hash or "")
+
+
 def decode_token(token: str) -> dict:
     try:
         return jwt.decode(token, SECRET, algorithms=["HS256"])
@@ -49,13 +68,63 @@ def decode_token(token: str) -> dict:
 # ---------------------------------------------------------
 # 2. OBTENER USUARIO DEL TOKEN
 # ---------------------------------------------------------
-async def get_current_user(token: HTTPAuthorizationCredentials = Security(security)):
-    user = decode_token(token.credentials)
+# Principal = payload del token con `rol` en mayúsculas y `nivel` ya
+# resuelto desde ROLE_HIERARCHY. Se cachea por token hasta su `exp`
+# (LRU acotada), así una petición con un token conocido no repite
+# la verificación HMAC ni el parseo del JSON.
+_tokens = OrderedDict()   # token → (vence_en epoch, principal)
+_tokens_lock = threading.Lock()
+_tokens_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
 
-    if "id_persona" not in user or "rol" not in user:
+def _principal(payload: dict) -> dict:
+    if "id_persona" not in payload or "rol" not in payload:
         raise HTTPException(status_code=401, detail="Token incompleto.")
+    rol = str(payload["rol"]).upper()
+    return {**payload, "rol": rol, "nivel": get_role_level(rol)}
+
+
+def _principal_cacheado(token: str) -> Optional[dict]:
+    with _tokens_lock:
+        item = _tokens.get(token)
+        if item is not None and item[0] > time.time():
+            _tokens.move_to_end(token)
+            _tokens_stats["hits"] += 1
+            return item[1]
+        if item is not None:
+            del _tokens[token]   # expiró: que decode_token responda "Token expirado."
+        _tokens_stats["misses"] += 1
+        return None
+
+
+def _cachear_principal(token: str, principal: dict):
+    vence = principal.get("exp")
+    vence = float(vence) if isinstance(vence, (int, float)) else time.time() + JWT_CACHE_TTL
+    with _tokens_lock:
+        _tokens[token] = (vence, principal)
+        _tokens.move_to_end(token)
+        while len(_tokens) > JWT_CACHE_MAXSIZE:
+            _tokens.popitem(last=False)
+            _tokens_stats["evictions"] += 1
+
+
+def token_cache_stats() -> dict:
+    with _tokens_lock:
+        total = _tokens_stats["hits"] + _tokens_stats["misses"]
+        return {
+            "entradas": len(_tokens),
+            "maxsize": JWT_CACHE_MAXSIZE,
+            **_tokens_stats,
+            "hit_ratio": round(_tokens_stats["hits"] / total, 3) if total else 0.0,
+        }
 
-    return user
+
+async def get_current_user(token: HTTPAuthorizationCredentials = Security(security)):
+    principal = _principal_cacheado(token.credentials)
+    if principal is None:
+        principal = _principal(decode_token(token.credentials))
+        _cachear_principal(token.credentials, principal)
+    return principal
 
 
 # ---------------------------------------------------------
@@ -66,19 +135,16 @@ def requires_role(required_roles: list[ROLES]):
     Permite acceso si el usuario tiene el rol requerido
     O un rol superior (ADMIN → ADMINISTRATIVO → TUTOR).
     """
-    def role_checker(user: dict = Depends(get_current_user)):
-        user_rol = user["rol"].upper()
-        user_lvl = get_role_level(user_rol)
-
-        for required in required_roles:
-            required_lvl = get_role_level(required.upper())
+    # Basta con alcanzar el menor nivel requerido; se calcula una sola vez.
+    nivel_minimo = min(get_role_level(r) for r in required_roles)
 
-            if user_lvl >= required_lvl:
-                return user  # acceso permitido
+    async def role_checker(user: dict = Depends(get_current_user)):
+        if user["nivel"] >= nivel_minimo:
+            return user  # acceso permitido
 
         raise HTTPException(
             status_code=403,
-            detail=f"No tiene permisos para esta operación (Rol actual: {user_rol})."
+            detail=f"No tiene permisos para esta operación (Rol actual: {user['rol']})."
         )
 
     return role_checker
@@ -103,7 +169,7 @@ async def get_person_id_to_act_on(
     - ADMINISTRADOR puede elegir un tutor, y si no lo hace actúa como él mismo.
     """
 
-    rol = user["rol"].upper()
+    rol = user["rol"]
     id_usuario = user["id_persona"]
 
     # TUTOR: solo sobre sí mismo
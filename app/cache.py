@@ -0,0 +1,291 @@
+# app/cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# ================================
+#  CONFIGURACIÓN
+# ================================
+REF_CACHE_TTL = int(os.getenv("REF_CACHE_TTL", "300"))          # segundos
+REF_CACHE_MAXSIZE = int(os.getenv("REF_CACHE_MAXSIZE", "512"))  # entradas por tabla
+
+# Cache de resultados de reportes: acotada en bytes (tamaño JSON aproximado).
+# El TTL acota lo viejo que puede estar un reporte ante escrituras de otros workers.
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "120"))
+REPORT_CACHE_MAXBYTES = int(os.getenv("REPORT_CACHE_MAXBYTES", str(32 * 1024 * 1024)))
+
+
+# ================================
+#  CACHE LRU CON TTL
+# ================================
+
+class TTLCache:
+    """
+    Cache LRU acotada en número de entradas, con expiración por TTL.
+    Segura entre hilos (los endpoints sync corren en el threadpool).
+    """
+
+    def __init__(self, nombre: str, maxsize: int = REF_CACHE_MAXSIZE, ttl: int = REF_CACHE_TTL):
+        self.nombre = nombre
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()   # clave → (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidaciones = 0
+
+    def get(self, clave):
+        """Retorna (encontrado, valor)."""
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is not None and item[0] > time.monotonic():
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return True, item[1]
+            if item is not None:
+                del self._datos[clave]
+            self.misses += 1
+            return False, None
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self.invalidaciones += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# ================================
+#  CACHE LRU POR BYTES (REPORTES)
+# ================================
+
+# Filas que se serializan para estimar el tamaño de un reporte
+_MUESTRA_FILAS = 16
+
+
+def _tamanio(valor) -> int:
+    """
+    Bytes aproximados del resultado en JSON. En listas se mide una muestra
+    de filas repartida por todo el resultado y se multiplica por el total:
+    medir el reporte completo costaría tanto como la serialización que la
+    cache quiere ahorrar.
+    """
+    if isinstance(valor, list) and len(valor) > _MUESTRA_FILAS:
+        paso = len(valor) // _MUESTRA_FILAS
+        muestra = valor[::paso][:_MUESTRA_FILAS]
+        medido = len(json.dumps(muestra, default=str, ensure_ascii=False))
+        return medido * len(valor) // len(muestra)
+    return len(json.dumps(valor, default=str, ensure_ascii=False))
+
+
+class ByteLRUCache:
+    """
+    Cache LRU acotada por el tamaño total de sus valores (no por número de
+    entradas), con TTL e invalidación selectiva por predicado sobre la clave.
+
+    Cada invalidación sube una generación. Quien va a llenar una entrada toma
+    generacion() antes de consultar la BD y la pasa a set(): si entre tanto
+    hubo una invalidación el resultado puede no incluir esa escritura y no se
+    guarda.
+    """
+
+    def __init__(self, nombre: str, maxbytes: int = REPORT_CACHE_MAXBYTES, ttl: int = REPORT_CACHE_TTL):
+        self.nombre = nombre
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._datos = OrderedDict()   # clave → (expira_en, valor, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidaciones = 0
+        self.rechazados = 0
+        self.descartados = 0
+        self._generacion = 0
+
+    def _quitar(self, clave):
+        self._bytes -= self._datos.pop(clave)[2]
+
+    def generacion(self) -> int:
+        with self._lock:
+            return self._generacion
+
+    def get(self, clave):
+        """Retorna (encontrado, valor)."""
+        with self._lock:
+            item = self._datos.get(clave)
+            if item is not None and item[0] > time.monotonic():
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return True, item[1]
+            if item is not None:
+                self._quitar(clave)
+            self.misses += 1
+            return False, None
+
+    def set(self, clave, valor, generacion: int | None = None):
+        """Guarda `valor`; con `generacion`, solo si no hubo invalidaciones desde entonces."""
+        if generacion is not None and generacion != self._generacion:
+            with self._lock:   # atajo antes de medir; se vuelve a revisar abajo
+                self.descartados += 1
+            return
+        nbytes = _tamanio(valor)
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                self.descartados += 1
+                return
+            if nbytes > self.maxbytes // 4:
+                self.rechazados += 1   # un solo reporte no puede desplazar toda la cache
+                return
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (time.monotonic() + self.ttl, valor, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.maxbytes:
+                self._quitar(next(iter(self._datos)))
+                self.evictions += 1
+
+    def invalidar_donde(self, predicado) -> int:
+        """Elimina las entradas cuya clave cumple `predicado`; retorna cuántas."""
+        with self._lock:
+            self._generacion += 1
+            claves = [c for c in self._datos if predicado(c)]
+            for c in claves:
+                self._quitar(c)
+            self.invalidaciones += len(claves)
+            return len(claves)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidaciones += len(self._datos)
+            self._datos.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "bytes": self._bytes,
+                "maxbytes": self.maxbytes,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidaciones": self.invalidaciones,
+                "rechazados": self.rechazados,
+                "descartados": self.descartados,
+            }
+
+
+report_cache = ByteLRUCache("REPORTES")
+
+
+# ================================
+#  REGISTRO POR TABLA DE REFERENCIA
+# ================================
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(nombre: str, **opciones) -> TTLCache:
+    """
+    Cache asociada a una tabla de referencia (se crea al primer uso;
+    `opciones` = maxsize/ttl si no son los de REF_CACHE_*).
+    """
+    with _caches_lock:
+        if nombre not in _caches:
+            _caches[nombre] = TTLCache(nombre, **opciones)
+        return _caches[nombre]
+
+
+def cached(nombre: str):
+    """
+    Decorador para funciones de lectura de crud.py sobre la tabla `nombre`.
+    La clave es la función más sus argumentos; las escrituras sobre la
+    tabla deben llamar a invalidar(nombre).
+    """
+    def decorador(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache(nombre)
+            clave = (fn.__name__, repr(args), repr(sorted(kwargs.items())))
+            encontrado, valor = cache.get(clave)
+            if encontrado:
+                return valor
+            valor = fn(*args, **kwargs)
+            cache.set(clave, valor)
+            return valor
+        return wrapper
+    return decorador
+
+
+def invalidar(*nombres: str):
+    """
+    Vacía las caches de las tablas indicadas (write-through desde crud.py).
+    Una cache que aún no existe no tiene nada que vaciar y no se crea aquí:
+    así conserva el ttl/maxsize con que la registre su dueño.
+    """
+    for nombre in nombres:
+        with _caches_lock:
+            cache = _caches.get(nombre)
+        if cache is not None:
+            cache.clear()
+
+
+# ================================
+#  VERSIONES POR TABLA (ETag)
+# ================================
+# La versión de cada tabla vive en VERSION_TABLA (la sube crud.py en la misma
+# transacción que la escritura), así que es la misma para todos los workers.
+# Aquí solo se recuerda la última versión vista por este proceso para vaciar
+# su cache cuando otro worker escribió.
+_vistas = {}              # nombre → versión de VERSION_TABLA vista por última vez
+_vistas_lock = threading.Lock()
+
+
+def alinear_version(nombre: str, version: int):
+    """Vacía la cache de `nombre` si su versión en la BD no es la última que vio este proceso."""
+    with _vistas_lock:
+        previa = _vistas.get(nombre)
+        _vistas[nombre] = version
+    if previa != version:
+        invalidar(nombre)
+
+
+def stats() -> dict:
+    with _caches_lock:
+        caches = list(_caches.values())
+    resultado = {c.nombre: c.stats() for c in caches}
+    resultado[report_cache.nombre] = report_cache.stats()
+    with _vistas_lock:
+        resultado["VERSIONES"] = dict(_vistas)
+    return resultado
@@ -0,0 +1,85 @@
+# app/calendario.py
+import bisect
+import os
+import threading
+import time
+from datetime import date
+from app.db import get_conn
+
+# Segundos antes de recargar FESTIVO (para ver cambios hechos por otros workers);
+# en este proceso crud.create_festivo/delete_festivo lo invalidan al instante.
+FESTIVO_CALENDAR_TTL = int(os.getenv("FESTIVO_CALENDAR_TTL", "3600"))
+
+
+def _ordinal(fecha) -> int:
+    if isinstance(fecha, date):  # incluye datetime
+        return fecha.toordinal()
+    return date.fromisoformat(str(fecha)[:10]).toordinal()
+
+
+class HolidayCalendar:
+    """
+    Calendario de festivos precalculado: arreglo ordenado de ordinales de
+    fecha más un bitset (un byte por día) entre el primer y el último festivo.
+    es_festivo() es O(1) y no toca la BD: quien consulta llama a
+    asegurar_vigente() (o carga con cargar_desde() desde el pool async) una
+    vez por petición o reporte, nunca por fila.
+    """
+
+    def __init__(self, ttl: int = FESTIVO_CALENDAR_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (ordinales, base, bits) se reemplaza entero para que una lectura
+        # concurrente nunca mezcle dos cargas
+        self._datos = ([], 0, bytearray())
+        self._cargado_en = None
+
+    def vigente(self) -> bool:
+        return self._cargado_en is not None and time.monotonic() - self._cargado_en <= self._ttl
+
+    def cargar_desde(self, fechas):
+        """Reconstruye el calendario a partir de las fechas de FESTIVO."""
+        ordinales = sorted({_ordinal(f) for f in fechas})
+        base = ordinales[0] if ordinales else 0
+        bits = bytearray(ordinales[-1] - base + 1 if ordinales else 0)
+        for o in ordinales:
+            bits[o - base] = 1
+
+        with self._lock:
+            self._datos = (ordinales, base, bits)
+            self._cargado_en = time.monotonic()
+
+    def asegurar_vigente(self):
+        """Recarga FESTIVO con el pool síncrono si el TTL venció. No usar desde el event loop."""
+        if self.vigente():
+            return
+        conn = get_conn()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT fecha FROM FESTIVO")
+            fechas = [r[0] for r in cur.fetchall()]
+        finally:
+            cur.close()
+            conn.close()
+        self.cargar_desde(fechas)
+
+    def es_festivo(self, fecha) -> bool:
+        if fecha is None or fecha == "":
+            return False
+        _, base, bits = self._datos
+        i = _ordinal(fecha) - base
+        return 0 <= i < len(bits) and bits[i] == 1
+
+    def festivos_entre(self, fecha_inicio, fecha_fin) -> list:
+        """Fechas festivas dentro de [fecha_inicio, fecha_fin]."""
+        ordinales = self._datos[0]
+        a = bisect.bisect_left(ordinales, _ordinal(fecha_inicio))
+        b = bisect.bisect_right(ordinales, _ordinal(fecha_fin))
+        return [date.fromordinal(o) for o in ordinales[a:b]]
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+
+calendario_festivos = HolidayCalendar()
@@ -0,0 +1,437 @@
+# app/crud_async.py
+# Variantes asíncronas de las funciones de crud.py / reports.py más usadas.
+# Usan el pool asíncrono (db_session_async), así los endpoints `async def`
+# no ocupan un hilo del threadpool por cada consulta en curso.
+import asyncio
+import os
+import oracledb
+from app.db import db_session_async
+from app.reports import (
+    sql_asistencia_aula,
+    sql_asistencia_tutor,
+    sql_resumen_semanal,
+    filas_asistencia,
+    filas_resumen_semanal,
+    clave_asistencia_aula,
+    clave_asistencia_tutor,
+    clave_resumen_semanal,
+    invalidar_asistencia,
+)
+from app.cache import report_cache, get_cache
+from app.auth import verify_password
+from app.rollups import SQL_ACUMULAR, params_acumular
+from app.nomina import SQL_MARCAR_PENDIENTE
+from app.utils import format_time
+from app.calendario import calendario_festivos
+from app.matricula_index import roster_index, SQL_MATRICULAS
+from app.rows import as_dicts
+from app.intervalos import a_minutos, duracion
+
+
+def _flag(value) -> int:
+    """'S'/'N' → 1/0 para las columnas NUMBER(1) de ASISTENCIA_AULA."""
+    return 1 if value == "S" else 0
+
+
+async def _merge(cur, sql: str, params: dict):
+    """
+    Ejecuta un MERGE de rollup o de marca. Si otra transacción insertó primero
+    la misma fila, este falla con ORA-00001 cuando ella hace commit; solo esa
+    sentencia se deshace, y repetirla una vez cae en WHEN MATCHED sin perder
+    la asistencia.
+    """
+    try:
+        await cur.execute(sql, params)
+    except oracledb.IntegrityError as e:
+        if e.args[0].code != 1:
+            raise
+        await cur.execute(sql, params)
+
+
+async def _acumular(cur, id_asist: int, signo: int):
+    await _merge(cur, SQL_ACUMULAR, params_acumular(id_asist, signo))
+
+
+async def _marcar_pendiente(cur, id_asist: int):
+    await _merge(cur, SQL_MARCAR_PENDIENTE, {"id_asist": id_asist})
+
+
+async def _calendario_vigente(cur):
+    """Recarga el calendario de festivos sin bloquear el event loop si expiró."""
+    if not calendario_festivos.vigente():
+        await cur.execute("SELECT fecha FROM FESTIVO")
+        calendario_festivos.cargar_desde([r[0] for r in await cur.fetchall()])
+
+
+async def _roster_vigente(cur):
+    """Igual que _calendario_vigente, para el índice de matrículas."""
+    if not roster_index.vigente():
+        cur.arraysize = 5000
+        await cur.execute(SQL_MATRICULAS)
+        roster_index.cargar_desde(await cur.fetchall())
+
+
+async def _roster_bd(cur, id_aula: int, fecha) -> list:
+    """
+    Roster del aula en `fecha` leído de HISTORICO_AULA_ESTUDIANTE, con el mismo
+    criterio [fecha_inicio, fecha_fin) del índice. Se usa cuando el índice en
+    memoria (que puede ir hasta ROSTER_INDEX_TTL atrás de otros workers) no
+    reconoce a algún estudiante.
+    """
+    await cur.execute("""
+        SELECT DISTINCT id_estudiante
+        FROM HISTORICO_AULA_ESTUDIANTE
+        WHERE id_aula = :id_aula
+          AND fecha_inicio <= :fecha
+          AND (fecha_fin IS NULL OR fecha_fin > :fecha)
+        ORDER BY id_estudiante
+    """, {"id_aula": id_aula, "fecha": fecha})
+    return [r[0] for r in await cur.fetchall()]
+
+
+# ============================
+# LOGIN
+# ============================
+# nombre_user → (hash, id_persona, rol) por pocos segundos: absorbe los
+# picos de login sin dejar sesiones con un rol viejo por mucho tiempo.
+# La cache es de cada proceso: crud.py la vacía al cambiar clave o rol en
+# el worker que hace el cambio, pero los demás workers pueden aceptar la
+# clave o el rol anteriores hasta LOGIN_CACHE_TTL segundos.
+LOGIN_CACHE_TTL = int(os.getenv("LOGIN_CACHE_TTL", "60"))
+
+# Se registra al importar para que su TTL no dependa de quién la use primero
+_CREDENCIALES = get_cache("CREDENCIALES", ttl=LOGIN_CACHE_TTL)
+
+
+def _credenciales():
+    return _CREDENCIALES
+
+
+async def login(nombre_user: str, contrasena: str):
+    """
+    Retorna {nombre_user, id_persona, rol} si la clave es correcta, o None.
+    Una sola consulta por PK de USUARIO; la verificación del hash corre
+    fuera del event loop.
+    """
+    encontrado, cred = _credenciales().get(nombre_user)
+    if not encontrado:
+        async with db_session_async() as conn:
+            cur = conn.cursor()
+            try:
+                await cur.execute("""
+                    SELECT u.contrasena, u.id_persona, p.rol
+                    FROM USUARIO u
+                    JOIN PERSONA p ON u.id_persona = p.id_persona
+                    WHERE u.nombre_user = :1
+                """, (nombre_user,))
+                cred = await cur.fetchone()
+            finally:
+                cur.close()
+        if cred is None:
+            return None
+        _credenciales().set(nombre_user, tuple(cred))
+
+    clave_hash, id_persona, rol = cred
+    if not await asyncio.to_thread(verify_password, contrasena, clave_hash):
+        return None
+    return {"nombre_user": nombre_user, "id_persona": id_persona, "rol": rol}
+
+
+# ============================
+# AULA / HORARIO
+# ============================
+
+async def get_aula(id_aula: int):
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT id_aula, id_institucion, id_sede, grado
+                FROM AULA
+                WHERE id_aula = :1
+            """, (id_aula,))
+            return await as_dicts(cur).fetchone()
+        finally:
+            cur.close()
+
+
+async def get_horario(id_horario: int):
+    """Obtiene un horario por ID."""
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT id_horario, dia_semana, h_inicio, h_final, minutos_equiv, es_continuo
+                FROM HORARIO
+                WHERE id_horario = :1
+            """, (id_horario,))
+            return await as_dicts(cur).fetchone()
+        finally:
+            cur.close()
+
+
+async def aula_tiene_tutor_activo(id_aula: int) -> bool:
+    """
+    ¿Hay alguna asignación en ese aula con fecha_fin NULL?
+    (Consulta por PK en TUTOR_AULA_ACTIVO.)
+    """
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("SELECT COUNT(*) FROM TUTOR_AULA_ACTIVO WHERE id_aula = :1", (id_aula,))
+            (count,) = await cur.fetchone()
+            return count > 0
+        finally:
+            cur.close()
+
+
+# ============================
+# ASISTENCIA AULA
+# ============================
+
+async def _insertar_asistencia_aula(cur, data: dict, id_actor: int):
+    """
+    Valida que `id_tutor_aula` sea la asignación activa del aula y pertenezca
+    al tutor `id_actor`, e inserta la fila de ASISTENCIA_AULA.
+    Retorna (error, id_asist).
+    """
+    await cur.execute("""
+        SELECT id_persona
+        FROM TUTOR_AULA_ACTIVO
+        WHERE id_aula = :1
+          AND id_tutor_aula = :2
+    """, (data["id_aula"], data["id_tutor_aula"]))
+    row = await cur.fetchone()
+    if not row:
+        return "La asignación de tutor no está activa para esta aula", None
+    if row[0] != id_actor:
+        return "El tutor indicado no corresponde a la asignación del aula", None
+
+    if not data.get("hora_fin"):
+        return "La hora de fin es obligatoria", None
+    if duracion(a_minutos(data["hora_inicio"]), a_minutos(data["hora_fin"])) <= 0:
+        return "La hora de fin debe ser posterior a la hora de inicio", None
+
+    # es_festivo lo decide el calendario, no el cliente
+    await _calendario_vigente(cur)
+    es_festivo = calendario_festivos.es_festivo(data["fecha_clase"])
+
+    id_asist_var = cur.var(oracledb.NUMBER)
+    await cur.execute("""
+        INSERT INTO ASISTENCIA_AULA (
+            id_aula, id_tutor_aula, id_horario, id_semana, fecha_clase,
+            hora_inicio, hora_fin, dictada, horas_dictadas, reposicion,
+            fecha_reposicion, id_motivo, corresponde_horario, es_festivo
+        )
+        VALUES (:1, :2, :3, :4, :5, :6, :7, :8, :9, :10, :11, :12, :13, :14)
+        RETURNING id_asist INTO :15
+    """, (
+        data["id_aula"], data["id_tutor_aula"], data["id_horario"], data["id_semana"],
+        data["fecha_clase"], format_time(data["hora_inicio"]),
+        format_time(data["hora_fin"]),
+        data["dictada"], data["horas_dictadas"], data.get("reposicion", "N"),
+        data.get("fecha_reposicion"), data.get("id_motivo"),
+        _flag(data["corresponde_horario"]), int(es_festivo),
+        id_asist_var
+    ))
+    id_asist = id_asist_var.getvalue()[0]
+    await _acumular(cur, id_asist, 1)
+    await _marcar_pendiente(cur, id_asist)
+    return None, id_asist
+
+
+async def registrar_asistencia(data: dict, id_actor: int):
+    """
+    Registra una fila de ASISTENCIA_AULA validando que `id_tutor_aula`
+    sea una asignación activa del aula y pertenezca al tutor `id_actor`.
+    """
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            error, id_asist = await _insertar_asistencia_aula(cur, data, id_actor)
+            if error:
+                return {"error": error}
+        finally:
+            cur.close()
+
+    # Después del commit, para que nadie vuelva a cachear el reporte sin la fila nueva
+    invalidar_asistencia(data["id_aula"], data["id_semana"], id_actor, data["fecha_clase"])
+    return {"ok": True, "id_asist": id_asist}
+
+
+async def registrar_asistencia_sesion(data: dict, id_actor: int):
+    """
+    Registra la clase completa en una transacción: la fila de ASISTENCIA_AULA
+    y una fila de ASISTENCIA_ESTUDIANTE por cada estudiante matriculado en el
+    aula ese día (un solo executemany). Los estudiantes del roster que no
+    vienen en la lista quedan con asistio = 'N'; si llega un estudiante que
+    no pertenece al aula en esa fecha no se registra nada.
+    """
+    estudiantes = data.get("estudiantes") or []
+    por_id = {}
+    for e in estudiantes:
+        if e["id_estudiante"] in por_id:
+            return {"error": f"Estudiante repetido en la lista: {e['id_estudiante']}"}
+        por_id[e["id_estudiante"]] = e
+
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await _roster_vigente(cur)
+            roster = roster_index.roster(data["id_aula"], data["fecha_clase"])
+            if not set(por_id) <= set(roster):
+                # El índice puede no tener aún una matrícula hecha en otro worker:
+                # la BD decide, y su roster es el que se registra
+                roster = await _roster_bd(cur, data["id_aula"], data["fecha_clase"])
+                roster_index.invalidar()
+            ajenos = sorted(set(por_id) - set(roster))
+            if ajenos:
+                return {
+                    "error": "Estudiantes no matriculados en el aula en la fecha de la clase",
+                    "id_estudiantes": ajenos,
+                }
+
+            error, id_asist = await _insertar_asistencia_aula(cur, data, id_actor)
+            if error:
+                return {"error": error}
+
+            filas = []
+            for id_estudiante in roster:
+                e = por_id.get(id_estudiante)
+                filas.append((
+                    id_asist, id_estudiante,
+                    e["asistio"] if e else "N",
+                    e.get("observacion") if e else None,
+                ))
+            if filas:
+                await cur.executemany("""
+                    INSERT INTO ASISTENCIA_ESTUDIANTE (id_asist, id_estudiante, asistio, observacion)
+                    VALUES (:1, :2, :3, :4)
+                """, filas)
+
+        finally:
+            cur.close()
+
+    invalidar_asistencia(data["id_aula"], data["id_semana"], id_actor, data["fecha_clase"])
+    return {
+        "ok": True,
+        "id_asist": id_asist,
+        "estudiantes": len(filas),
+        "asistieron": sum(1 for f in filas if f[2] == "S"),
+    }
+
+
+# Columnas corregibles de ASISTENCIA_AULA → conversión del valor recibido
+_CORREGIBLES = {
+    "dictada": None,
+    "horas_dictadas": None,
+    "reposicion": None,
+    "fecha_reposicion": None,
+    "id_motivo": None,
+    "hora_inicio": format_time,
+    "hora_fin": format_time,
+}
+
+
+async def corregir_asistencia(id_asist: int, data: dict, id_actor: int):
+    """
+    Corrige una fila de ASISTENCIA_AULA del tutor `id_actor` y ajusta
+    ASISTENCIA_SEMANAL en la misma transacción (resta la fila vieja, suma la nueva).
+    """
+    campos = {k: v for k, v in data.items() if k in _CORREGIBLES and v is not None}
+    if not campos:
+        return {"error": "No hay campos para corregir"}
+
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute("""
+                SELECT at.id_persona, aa.id_aula, aa.id_semana, aa.fecha_clase,
+                       aa.hora_inicio, aa.hora_fin
+                FROM ASISTENCIA_AULA aa
+                LEFT JOIN ASIGNACION_TUTOR at ON aa.id_tutor_aula = at.id_tutor_aula
+                WHERE aa.id_asist = :1
+                FOR UPDATE OF aa.id_asist
+            """, (id_asist,))
+            row = await cur.fetchone()
+            if not row:
+                return {"error": "Asistencia no encontrada"}
+            if row[0] != id_actor:
+                return {"error": "La asistencia no pertenece al tutor indicado"}
+
+            sets = ", ".join(f"{k} = :{k}" for k in campos)
+            params = {k: (_CORREGIBLES[k](v) if _CORREGIBLES[k] else v) for k, v in campos.items()}
+            params["id_asist"] = id_asist
+
+            hora_inicio = params.get("hora_inicio", row[4])
+            hora_fin = params.get("hora_fin", row[5])
+            if hora_fin and duracion(a_minutos(hora_inicio), a_minutos(hora_fin)) <= 0:
+                return {"error": "La hora de fin debe ser posterior a la hora de inicio"}
+
+            await _acumular(cur, id_asist, -1)
+            await cur.execute(f"UPDATE ASISTENCIA_AULA SET {sets} WHERE id_asist = :id_asist", params)
+            await _acumular(cur, id_asist, 1)
+            await _marcar_pendiente(cur, id_asist)
+        finally:
+            cur.close()
+
+    id_aula, id_semana, fecha_clase = row[1:4]
+    invalidar_asistencia(id_aula, id_semana, id_actor, fecha_clase)
+    return {"ok": True, "id_asist": id_asist}
+
+
+# ============================
+# REPORTES
+# ============================
+
+async def _ejecutar_reporte(sql, params):
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await _calendario_vigente(cur)
+            await cur.execute(sql, params)
+            return await filas_asistencia(cur).fetchall()
+        finally:
+            cur.close()
+
+
+async def reporte_asistencia_aula(id_aula: int, id_semana: int | None = None):
+    """Versión asíncrona de reports.reporte_asistencia_aula (misma cache)."""
+    clave = clave_asistencia_aula(id_aula, id_semana)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if not encontrado:
+        filas = await _ejecutar_reporte(*sql_asistencia_aula(id_aula, id_semana))
+        report_cache.set(clave, filas, generacion)
+    return filas
+
+
+async def reporte_asistencia_tutor(id_persona: int, fecha_inicio: str, fecha_fin: str):
+    """Versión asíncrona de reports.reporte_asistencia_tutor (misma cache)."""
+    clave = clave_asistencia_tutor(id_persona, fecha_inicio, fecha_fin)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if not encontrado:
+        filas = await _ejecutar_reporte(*sql_asistencia_tutor(id_persona, fecha_inicio, fecha_fin))
+        report_cache.set(clave, filas, generacion)
+    return filas
+
+
+async def reporte_resumen_semanal(id_aula: int | None = None, id_persona: int | None = None,
+                                  fecha_inicio: str | None = None, fecha_fin: str | None = None):
+    """Versión asíncrona de reports.reporte_resumen_semanal (misma cache)."""
+    clave = clave_resumen_semanal(id_aula, id_persona, fecha_inicio, fecha_fin)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if encontrado:
+        return filas
+
+    async with db_session_async() as conn:
+        cur = conn.cursor()
+        try:
+            await cur.execute(*sql_resumen_semanal(id_aula, id_persona, fecha_inicio, fecha_fin))
+            filas = await filas_resumen_semanal(cur).fetchall()
+        finally:
+            cur.close()
+    report_cache.set(clave, filas, generacion)
+    return filas
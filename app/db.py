@@ -1,9 +1,12 @@
 # app/db.py
 
 import os
+import bisect
+import threading
+import time
 import oracledb
 from dotenv import load_dotenv
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
 # ================================
 #  CARGA DE VARIABLES DE ENTORNO
@@ -14,10 +17,38 @@ DB_USER = os.getenv("DB_USER", "GLOBALENGLISH")
 DB_PASS = os.getenv("DB_PASS", "oracle")
 DB_DSN  = os.getenv("DB_DSN", "localhost:1521/XEPDB1")
 
+# Dimensionamiento del pool (por worker de uvicorn/gunicorn).
+# DB_POOL_MAX es el total de sesiones del worker, repartido entre el pool
+# síncrono y el asíncrono (DB_POOL_ASYNC_MAX; el resto queda para el síncrono),
+# así que debe ser al menos 2: con menos el arranque falla en vez de abrir
+# más sesiones de las configuradas.
+DB_POOL_MIN           = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX           = int(os.getenv("DB_POOL_MAX", "5"))
+if DB_POOL_MAX < 2:
+    raise ValueError(
+        f"DB_POOL_MAX={DB_POOL_MAX}: se necesitan al menos 2 sesiones por worker "
+        "(una para el pool síncrono y una para el asíncrono)"
+    )
+DB_POOL_ASYNC_MAX     = min(max(1, int(os.getenv("DB_POOL_ASYNC_MAX", str(DB_POOL_MAX // 2)))), DB_POOL_MAX - 1)
+DB_POOL_SYNC_MAX      = DB_POOL_MAX - DB_POOL_ASYNC_MAX
+DB_POOL_INCREMENT     = int(os.getenv("DB_POOL_INCREMENT", "1"))
+DB_POOL_GETMODE       = os.getenv("DB_POOL_GETMODE", "WAIT").upper()   # WAIT | NOWAIT | FORCEGET | TIMEDWAIT
+DB_POOL_WAIT_TIMEOUT  = int(os.getenv("DB_POOL_WAIT_TIMEOUT", "0"))    # ms, solo aplica con TIMEDWAIT
+DB_POOL_PING_INTERVAL = int(os.getenv("DB_POOL_PING_INTERVAL", "60"))  # segundos
+DB_STMT_CACHE_SIZE    = int(os.getenv("DB_STMT_CACHE_SIZE", "20"))
+
+_GETMODES = {
+    "WAIT": oracledb.POOL_GETMODE_WAIT,
+    "NOWAIT": oracledb.POOL_GETMODE_NOWAIT,
+    "FORCEGET": oracledb.POOL_GETMODE_FORCEGET,
+    "TIMEDWAIT": oracledb.POOL_GETMODE_TIMEDWAIT,
+}
+
 # ================================
 #  POOL DE CONEXIONES GLOBAL
 # ================================
 _pool = None
+_pool_async = None
 
 
 def init_pool():
@@ -31,21 +62,177 @@ def init_pool():
             user=DB_USER,
             password=DB_PASS,
             dsn=DB_DSN,
-            min=1,
-            max=5,
-            increment=1,
+            min=min(DB_POOL_MIN, DB_POOL_SYNC_MAX),
+            max=DB_POOL_SYNC_MAX,
+            increment=DB_POOL_INCREMENT,
+            getmode=_GETMODES.get(DB_POOL_GETMODE, oracledb.POOL_GETMODE_WAIT),
+            wait_timeout=DB_POOL_WAIT_TIMEOUT,
+            ping_interval=DB_POOL_PING_INTERVAL,
+            stmtcachesize=DB_STMT_CACHE_SIZE,
             homogeneous=True
         )
 
     return _pool
 
 
+def init_pool_async():
+    """
+    Inicializa el pool asíncrono (solo una vez, dentro del event loop).
+    Misma configuración que el pool síncrono salvo el máximo (DB_POOL_ASYNC_MAX).
+    """
+    global _pool_async
+
+    if _pool_async is None:
+        _pool_async = oracledb.create_pool_async(
+            user=DB_USER,
+            password=DB_PASS,
+            dsn=DB_DSN,
+            min=min(DB_POOL_MIN, DB_POOL_ASYNC_MAX),
+            max=DB_POOL_ASYNC_MAX,
+            increment=DB_POOL_INCREMENT,
+            getmode=_GETMODES.get(DB_POOL_GETMODE, oracledb.POOL_GETMODE_WAIT),
+            wait_timeout=DB_POOL_WAIT_TIMEOUT,
+            ping_interval=DB_POOL_PING_INTERVAL,
+            stmtcachesize=DB_STMT_CACHE_SIZE,
+            homogeneous=True
+        )
+
+    return _pool_async
+
+
+async def close_pool_async():
+    """
+    Cierra el pool asíncrono (al apagar la aplicación).
+    """
+    global _pool_async
+
+    if _pool_async is not None:
+        await _pool_async.close()
+        _pool_async = None
+
+
+# ================================
+#  ESTADÍSTICAS DEL POOL
+# ================================
+# Límites superiores (ms) de los buckets del histograma de espera.
+_ACQUIRE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Errores que indican que no se obtuvo conexión a tiempo
+# (thin: DPY-4005, thick: ORA-24457 / ORA-24418).
+_ACQUIRE_TIMEOUT_CODES = ("DPY-4005", "ORA-24457", "ORA-24418")
+
+_stats_lock = threading.Lock()
+_stats = {
+    "acquires": 0,
+    "timeouts": 0,
+    "errors": 0,
+    "waiting": 0,
+    "acquire_ms_total": 0.0,
+    "acquire_ms_max": 0.0,
+    "histogram": [0] * (len(_ACQUIRE_BUCKETS_MS) + 1),
+}
+
+
+def _record_acquire(elapsed_ms: float):
+    idx = bisect.bisect_left(_ACQUIRE_BUCKETS_MS, elapsed_ms)
+    with _stats_lock:
+        _stats["acquires"] += 1
+        _stats["acquire_ms_total"] += elapsed_ms
+        if elapsed_ms > _stats["acquire_ms_max"]:
+            _stats["acquire_ms_max"] = elapsed_ms
+        _stats["histogram"][idx] += 1
+
+
+def _record_acquire_error(error: Exception):
+    key = "timeouts" if any(c in str(error) for c in _ACQUIRE_TIMEOUT_CODES) else "errors"
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def pool_stats() -> dict:
+    """
+    Devuelve el estado actual del pool y las métricas de adquisición
+    acumuladas desde el arranque del proceso.
+    """
+    pool = init_pool()
+
+    with _stats_lock:
+        snapshot = dict(_stats)
+        histogram = list(_stats["histogram"])
+
+    pool_async = None
+    if _pool_async is not None:
+        pool_async = {"busy": _pool_async.busy, "open": _pool_async.opened}
+
+    labels = [f"<={b}ms" for b in _ACQUIRE_BUCKETS_MS] + [f">{_ACQUIRE_BUCKETS_MS[-1]}ms"]
+    acquires = snapshot["acquires"]
+
+    return {
+        "config": {
+            "min": DB_POOL_MIN,
+            "max": DB_POOL_MAX,
+            "max_sync": DB_POOL_SYNC_MAX,
+            "max_async": DB_POOL_ASYNC_MAX,
+            "increment": DB_POOL_INCREMENT,
+            "getmode": DB_POOL_GETMODE,
+            "wait_timeout_ms": DB_POOL_WAIT_TIMEOUT,
+            "ping_interval_s": DB_POOL_PING_INTERVAL,
+            "stmtcachesize": DB_STMT_CACHE_SIZE,
+        },
+        "busy": pool.busy,
+        "open": pool.opened,
+        "waiting": snapshot["waiting"],
+        "acquires": acquires,
+        "timeouts": snapshot["timeouts"],
+        "errors": snapshot["errors"],
+        "acquire_ms_avg": round(snapshot["acquire_ms_total"] / acquires, 3) if acquires else 0.0,
+        "acquire_ms_max": round(snapshot["acquire_ms_max"], 3),
+        "acquire_histogram": dict(zip(labels, histogram)),
+        "async_pool": pool_async,
+    }
+
+
 def get_conn():
     """
-    Obtiene una conexión activa desde el pool.
+    Obtiene una conexión activa desde el pool, midiendo el tiempo de espera.
     """
     pool = init_pool()
-    conn = pool.acquire()
+
+    with _stats_lock:
+        _stats["waiting"] += 1
+    start = time.perf_counter()
+    try:
+        conn = pool.acquire()
+    except oracledb.Error as e:
+        _record_acquire_error(e)
+        raise
+    finally:
+        with _stats_lock:
+            _stats["waiting"] -= 1
+
+    _record_acquire((time.perf_counter() - start) * 1000)
+    return conn
+
+
+async def get_conn_async():
+    """
+    Versión asíncrona de get_conn(): no bloquea el event loop mientras espera.
+    """
+    pool = init_pool_async()
+
+    with _stats_lock:
+        _stats["waiting"] += 1
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire()
+    except oracledb.Error as e:
+        _record_acquire_error(e)
+        raise
+    finally:
+        with _stats_lock:
+            _stats["waiting"] -= 1
+
+    _record_acquire((time.perf_counter() - start) * 1000)
     return conn
 
 
@@ -88,3 +275,30 @@ def db_session():
         raise e
     finally:
         release_conn(conn)
+
+
+@asynccontextmanager
+async def db_session_async():
+    """
+    Equivalente asíncrono de db_session().
+
+    Uso:
+        async with db_session_async() as conn:
+            cur = conn.cursor()
+            await cur.execute(...)
+    """
+    conn = None
+    try:
+        conn = await get_conn_async()
+        yield conn
+        await conn.commit()
+    except Exception as e:
+        if conn:
+            await conn.rollback()
+        raise e
+    finally:
+        if conn:
+            try:
+                await init_pool_async().release(conn)
+            except Exception:
+                pass  # Evita errores silenciosamente si ya fue liberada
@@ -0,0 +1,182 @@
+# app/exports.py
+import csv
+import io
+import os
+from datetime import date, datetime
+import oracledb
+import orjson
+from app.db import get_conn
+from app.rows import as_tuples
+
+# Filas por fetchmany(); la memoria usada es proporcional a este valor,
+# no al tamaño de la tabla.
+EXPORT_ARRAYSIZE = int(os.getenv("EXPORT_ARRAYSIZE", "1000"))
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# ============================
+# TABLAS EXPORTABLES
+# ============================
+# tabla → (SELECT sin WHERE/ORDER, columna de fecha filtrable, ORDER BY)
+_EXPORTABLES = {
+    "persona": (
+        """SELECT id_persona, tipo_doc, num_documento, nombre, telefono, correo, rol
+           FROM PERSONA""",
+        None,
+        "id_persona",
+    ),
+    "estudiante": (
+        """SELECT id_estudiante, tipo_documento, num_documento, nombres, apellidos,
+                  telefono, fecha_nacimiento, correo, score_entrada, score_salida
+           FROM ESTUDIANTE""",
+        None,
+        "id_estudiante",
+    ),
+    "asistencia_aula": (
+        """SELECT id_asist, id_aula, id_tutor_aula, id_horario, id_semana, fecha_clase,
+                  hora_inicio, hora_fin, dictada, horas_dictadas, reposicion,
+                  fecha_reposicion, id_motivo, corresponde_horario, es_festivo
+           FROM ASISTENCIA_AULA""",
+        "fecha_clase",
+        "fecha_clase, id_asist",
+    ),
+    "horas_tutor": (
+        """SELECT id_persona, id_aula, fecha, sesiones, horas_dictadas,
+                  minutos_reales, horas_equivalentes
+           FROM LIBRO_HORAS_TUTOR""",
+        "fecha",
+        "fecha, id_persona, id_aula",
+    ),
+    "nota_estudiante": (
+        """SELECT id_nota, id_estudiante, id_componente, nota
+           FROM NOTA_ESTUDIANTE""",
+        None,
+        "id_nota",
+    ),
+}
+
+
+def _iso(v):
+    return v.isoformat()
+
+
+# Fechas a ISO-8601 en el CSV; se elige por tipo de columna, no por valor
+_CONV_CSV = {oracledb.DB_TYPE_DATE: _iso, oracledb.DB_TYPE_TIMESTAMP: _iso}
+
+
+def _sql_export(tabla: str, fecha_inicio: str | None, fecha_fin: str | None):
+    select, col_fecha, orden = _EXPORTABLES[tabla]
+    params = {}
+    condiciones = []
+
+    if col_fecha and fecha_inicio:
+        condiciones.append(f"{col_fecha} >= TO_DATE(:fecha_inicio, 'YYYY-MM-DD')")
+        params["fecha_inicio"] = fecha_inicio
+    if col_fecha and fecha_fin:
+        condiciones.append(f"{col_fecha} <= TO_DATE(:fecha_fin, 'YYYY-MM-DD')")
+        params["fecha_fin"] = fecha_fin
+
+    sql = select
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    return sql + f" ORDER BY {orden}", params
+
+
+def _fecha(nombre: str, valor: str | None) -> date | None:
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{nombre} inválida (YYYY-MM-DD): {valor}")
+
+
+def _lotes(sql: str, params: dict, por_tipo=None):
+    """
+    Ejecuta la consulta YA (antes de enviar la respuesta, para que un error
+    de la BD no corte la descarga a medias) y retorna un generador de
+    (columnas, filas) lote a lote. La conexión se libera al terminar o si el
+    cliente corta la descarga.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.arraysize = EXPORT_ARRAYSIZE
+        cur.prefetchrows = EXPORT_ARRAYSIZE + 1
+        cur.execute(sql, params)
+        columns = list(as_tuples(cur, por_tipo))
+    except Exception:
+        cur.close()
+        conn.close()
+        raise
+
+    def generar():
+        try:
+            while True:
+                rows = cur.fetchmany()
+                if not rows:
+                    break
+                yield columns, rows
+        finally:
+            cur.close()
+            conn.close()
+
+    return generar()
+
+
+def _ndjson(lotes):
+    # orjson escribe date/datetime en ISO-8601 y UTF-8 sin escapar
+    for columns, rows in lotes:
+        yield b"".join(
+            orjson.dumps(dict(zip(columns, row)), option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def _csv(lotes):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    encabezado = True
+
+    for columns, rows in lotes:
+        if encabezado:
+            writer.writerow(columns)
+            encabezado = False
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def validar(tabla: str, formato: str = "ndjson",
+            fecha_inicio: str | None = None, fecha_fin: str | None = None) -> str:
+    """
+    Revisa los parámetros de exportar() sin tocar la BD. Retorna la tabla
+    normalizada; lanza ValueError si algo no es válido.
+    """
+    tabla = tabla.lower()
+    if tabla not in _EXPORTABLES:
+        raise ValueError(f"Tabla no exportable: {tabla}")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    inicio, fin = _fecha("fecha_inicio", fecha_inicio), _fecha("fecha_fin", fecha_fin)
+    if inicio and fin and inicio > fin:
+        raise ValueError("fecha_inicio posterior a fecha_fin")
+    return tabla
+
+
+def exportar(tabla: str, formato: str = "ndjson",
+             fecha_inicio: str | None = None, fecha_fin: str | None = None):
+    """
+    Retorna un generador de fragmentos de texto (NDJSON o CSV) con toda la tabla.
+    Lanza ValueError si la tabla, el formato o las fechas no son válidos.
+    """
+    tabla = validar(tabla, formato, fecha_inicio, fecha_fin)
+
+    sql, params = _sql_export(tabla, fecha_inicio, fecha_fin)
+    if formato == "csv":
+        return _csv(_lotes(sql, params, _CONV_CSV))
+    return _ndjson(_lotes(sql, params))
@@ -0,0 +1,215 @@
+# app/horario_index.py
+import bisect
+import os
+import threading
+import time
+from typing import Optional
+from app.db import get_conn
+from app.intervalos import a_minutos, duracion
+
+# ================================
+#  CONFIGURACIÓN
+# ================================
+# El índice se recarga completo pasado este tiempo (segundos), para recoger
+# asignaciones hechas por otros workers/procesos.
+SCHEDULE_INDEX_TTL = int(os.getenv("SCHEDULE_INDEX_TTL", "300"))
+
+MINUTOS_EQUIV_DEFECTO = 45
+
+# Rangos de jornada en minutos desde medianoche: [inicio, fin)
+RANGO_MANIANA = (6 * 60, 13 * 60)
+RANGO_TARDE = (13 * 60, 18 * 60)
+
+DIAS_PRIMARIA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes")
+DIAS_SECUNDARIA = DIAS_PRIMARIA + ("Sábado",)
+
+
+def max_equiv_grado(grado: str) -> int:
+    """Máximo de minutos equivalentes asignables a un aula según su grado."""
+    if grado in ("4", "5"):
+        return 2 * 45   # dos horas equivalentes
+    return 3 * 45       # tres horas equivalentes (9º/10º y resto)
+
+
+# ================================
+#  AGENDA DE UN AULA
+# ================================
+
+class AgendaAula:
+    """
+    Horarios activos de un aula: por día, franjas ordenadas por inicio
+    (en minutos) y el total de minutos equivalentes ya asignados.
+    """
+    __slots__ = ("por_dia", "total_equiv")
+
+    def __init__(self):
+        # dia → lista ordenada de (ini, fin, id_hist, h_inicio, h_final)
+        self.por_dia = {}
+        self.total_equiv = 0
+
+    def copia(self) -> "AgendaAula":
+        nueva = AgendaAula()
+        nueva.por_dia = {dia: list(franjas) for dia, franjas in self.por_dia.items()}
+        nueva.total_equiv = self.total_equiv
+        return nueva
+
+    def agregar(self, id_hist, dia, h_inicio, h_final, minutos_equiv):
+        franja = (a_minutos(h_inicio), a_minutos(h_final), id_hist, h_inicio, h_final)
+        bisect.insort(self.por_dia.setdefault(dia, []), franja)
+        self.total_equiv += minutos_equiv or MINUTOS_EQUIV_DEFECTO
+
+    def quitar(self, id_hist, dia, minutos_equiv):
+        franjas = self.por_dia.get(dia, [])
+        self.por_dia[dia] = [f for f in franjas if f[2] != id_hist]
+        self.total_equiv -= minutos_equiv or MINUTOS_EQUIV_DEFECTO
+
+    def conflicto(self, dia, ini, fin) -> Optional[tuple]:
+        """
+        Retorna (es_duplicado, franja) para la primera franja del día que
+        choca con [ini, fin), o None si no hay cruce.
+        """
+        franjas = self.por_dia.get(dia)
+        if not franjas:
+            return None
+
+        # Solo pueden cruzarse las franjas que empiezan antes de `fin`.
+        k = bisect.bisect_left(franjas, (fin,))
+        choque = None
+        for f in reversed(franjas[:k]):
+            if f[0] == ini and f[1] == fin:
+                return True, f
+            if f[1] > ini and choque is None:
+                choque = f
+        return (False, choque) if choque else None
+
+
+def validar_franja(agenda: AgendaAula, grado, jornada, dia, h_inicio, h_final, minutos_equiv):
+    """
+    Reglas de validar_horario_aula sobre una agenda ya cargada:
+    ventanas por grado/jornada, duplicidad, cruce y tope de horas equivalentes.
+    Retorna (True, "OK") o (False, mensaje).
+    """
+    ini, fin = a_minutos(h_inicio), a_minutos(h_final)
+    if duracion(ini, fin) <= 0:
+        return False, "La hora final del horario debe ser posterior a la inicial."
+
+    def en_rango(m, rango):
+        return rango[0] <= m < rango[1]
+
+    def franja_en(rango):
+        return en_rango(ini, rango) and en_rango(fin, rango)
+
+    # Validaciones por grado/jornada
+    if grado in ("4", "5"):
+        if dia not in DIAS_PRIMARIA:
+            return False, "Solo lunes a viernes para 4º/5º."
+        if jornada == "MAÑANA" and not franja_en(RANGO_MANIANA):
+            return False, "En 4º/5º con jornada MAÑANA: horario debe estar entre 06:00 y 13:00."
+        elif jornada == "TARDE" and not franja_en(RANGO_TARDE):
+            return False, "En 4º/5º con jornada TARDE: horario debe estar entre 13:00 y 18:00."
+        # MIXTA permite ambos rangos
+    elif grado in ("9", "10"):
+        if dia not in DIAS_SECUNDARIA:
+            return False, "Solo lunes a sábado para 9º/10º."
+        if jornada == "MAÑANA" and not franja_en(RANGO_TARDE):
+            return False, "En 9º/10º con jornada MAÑANA: horario debe estar en la TARDE."
+        elif jornada == "TARDE" and not franja_en(RANGO_MANIANA):
+            return False, "En 9º/10º con jornada TARDE: horario debe estar en la MAÑANA."
+        # MIXTA permite ambas
+
+    # Cruce y duplicidad EXACTA de horario
+    choque = agenda.conflicto(dia, ini, fin)
+    if choque:
+        duplicado, f = choque
+        if duplicado:
+            return False, "El horario ya está asignado a esta aula para ese día y franja."
+        return False, f"Cruce con horario existente ({dia} {f[3]}-{f[4]})."
+
+    # Suma máxima de horas equivalentes
+    max_equiv = max_equiv_grado(grado)
+    if agenda.total_equiv + (minutos_equiv or MINUTOS_EQUIV_DEFECTO) > max_equiv:
+        return False, f"Supera el máximo de horas equivalentes permitidas ({max_equiv // 45} horas)"
+
+    return True, "OK"
+
+
+# ================================
+#  ÍNDICE GLOBAL (todas las aulas)
+# ================================
+
+class ScheduleIndex:
+    """
+    Agendas activas (HISTORICO_HORARIO_AULA con fecha_fin NULL) de todas las
+    aulas, cargadas con una sola consulta y mantenidas al día por
+    asignar_horario_aula / finalizar_historial_horario.
+    """
+
+    def __init__(self, ttl: int = SCHEDULE_INDEX_TTL):
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._aulas = {}       # id_aula → AgendaAula
+        self._historial = {}   # id_hist → (id_aula, dia, minutos_equiv)
+        self._cargado_en = None
+
+    def _cargar(self):
+        conn = get_conn()
+        cur = conn.cursor()
+        try:
+            cur.arraysize = 1000
+            cur.execute("""
+                SELECT ha.id_hist_horario, ha.id_aula, ho.dia_semana,
+                       ho.h_inicio, ho.h_final, ho.minutos_equiv
+                FROM HISTORICO_HORARIO_AULA ha
+                JOIN HORARIO ho ON ha.id_horario = ho.id_horario
+                WHERE ha.fecha_fin IS NULL
+            """)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+
+        aulas, historial = {}, {}
+        for id_hist, id_aula, dia, h_ini, h_fin, min_equiv in rows:
+            aulas.setdefault(id_aula, AgendaAula()).agregar(id_hist, dia, h_ini, h_fin, min_equiv)
+            historial[id_hist] = (id_aula, dia, min_equiv)
+
+        self._aulas, self._historial = aulas, historial
+        self._cargado_en = time.monotonic()
+
+    def _asegurar_vigente(self):
+        if self._cargado_en is None or time.monotonic() - self._cargado_en > self._ttl:
+            self._cargar()
+
+    def agenda(self, id_aula: int) -> AgendaAula:
+        """Copia de la agenda activa del aula (vacía si no tiene horarios)."""
+        with self._lock:
+            self._asegurar_vigente()
+            agenda = self._aulas.get(id_aula)
+            return agenda.copia() if agenda else AgendaAula()
+
+    def validar(self, id_aula, grado, jornada, dia, h_inicio, h_final, minutos_equiv):
+        with self._lock:
+            self._asegurar_vigente()
+            agenda = self._aulas.get(id_aula) or AgendaAula()
+            return validar_franja(agenda, grado, jornada, dia, h_inicio, h_final, minutos_equiv)
+
+    def agregar(self, id_hist, id_aula, dia, h_inicio, h_final, minutos_equiv):
+        with self._lock:
+            if self._cargado_en is None or id_hist in self._historial:
+                return  # Se verá en la próxima carga completa
+            self._aulas.setdefault(id_aula, AgendaAula()).agregar(id_hist, dia, h_inicio, h_final, minutos_equiv)
+            self._historial[id_hist] = (id_aula, dia, minutos_equiv)
+
+    def quitar(self, id_hist):
+        with self._lock:
+            datos = self._historial.pop(id_hist, None)
+            if datos:
+                id_aula, dia, minutos_equiv = datos
+                self._aulas[id_aula].quitar(id_hist, dia, minutos_equiv)
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+
+schedule_index = ScheduleIndex()
@@ -0,0 +1,94 @@
+# app/intervalos.py
+# Aritmética de franjas horarias en minutos desde medianoche.
+# HORARIO y ASISTENCIA_AULA guardan las horas como VARCHAR2(5) 'HH:MM'; aquí
+# se convierten una vez a enteros y las operaciones trabajan sobre columnas
+# completas con NumPy (dependencia obligatoria, como en notas.py y nomina.py).
+import numpy as np
+
+# Hora ausente o no parseable
+SIN_HORA = -1
+
+
+# ============================================================
+# CONVERSIÓN
+# ============================================================
+def a_minutos(h) -> int:
+    """'HH:MM[:SS]' (o datetime.time) → minutos desde medianoche; SIN_HORA si no aplica."""
+    if h is None or h == "":
+        return SIN_HORA
+    if hasattr(h, "hour"):
+        return h.hour * 60 + h.minute
+    try:
+        return int(h[:2]) * 60 + int(h[3:5])
+    except (ValueError, TypeError):
+        return SIN_HORA
+
+
+def duracion(ini: int, fin: int) -> int:
+    """Versión escalar de duraciones()."""
+    return fin - ini if ini >= 0 and fin > ini else 0
+
+
+def minutos(valores) -> np.ndarray:
+    """Columna de horas → arreglo de minutos."""
+    return np.asarray([a_minutos(v) for v in valores], dtype=np.int64)
+
+
+def _arr(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.int64)
+
+
+# ============================================================
+# OPERACIONES POR ELEMENTO (franjas [ini, fin))
+# ============================================================
+def duraciones(ini, fin):
+    """fin - ini por franja; 0 si falta alguna hora o fin <= ini."""
+    ini, fin = _arr(ini), _arr(fin)
+    validas = (ini >= 0) & (fin > ini)
+    return np.where(validas, fin - ini, 0)
+
+
+def solapan(ini_a, fin_a, ini_b, fin_b):
+    """¿La franja a[k] se cruza con b[k]? (tocarse en un extremo no es cruce)."""
+    ini_a, fin_a, ini_b, fin_b = map(_arr, (ini_a, fin_a, ini_b, fin_b))
+    return (ini_a < fin_b) & (ini_b < fin_a)
+
+
+def contenidas(ini, fin, ini_rango, fin_rango):
+    """¿La franja [ini, fin) está dentro de [ini_rango, fin_rango]? (por elemento)."""
+    ini, fin, ini_rango, fin_rango = map(_arr, (ini, fin, ini_rango, fin_rango))
+    return (ini >= ini_rango) & (fin <= fin_rango) & (ini >= 0) & (fin > ini)
+
+
+# ============================================================
+# AGREGADOS
+# ============================================================
+def suma_duraciones(ini, fin, grupos=None, n_grupos: int | None = None):
+    """
+    Minutos totales; con `grupos` (enteros 0..n-1) retorna el total por grupo.
+    """
+    d = duraciones(ini, fin)
+    if grupos is None:
+        return int(d.sum())
+    return np.bincount(_arr(grupos), weights=d, minlength=n_grupos or 0).astype(np.int64)
+
+
+def cruces_consecutivos(grupos, ini, fin):
+    """
+    Para franjas ORDENADAS por (grupo, ini): marca las que empiezan antes de
+    que termine la anterior del mismo grupo. Retorna un booleano por franja.
+    """
+    grupos, ini, fin = _arr(grupos), _arr(ini), _arr(fin)
+    marca = np.zeros(len(ini), dtype=bool)
+    if len(ini) > 1:
+        # fin máximo acumulado dentro del grupo hasta la franja anterior
+        marca[1:] = (grupos[1:] == grupos[:-1]) & (ini[1:] < _max_acumulado(grupos, fin)[:-1])
+    return marca
+
+
+def _max_acumulado(grupos, valores):
+    """Máximo acumulado de `valores` que se reinicia en cada cambio de grupo."""
+    inicio_grupo = np.r_[True, grupos[1:] != grupos[:-1]]
+    # Desplaza cada grupo por encima de los anteriores para usar un solo maximum.accumulate
+    base = np.cumsum(inicio_grupo) * (int(valores.max()) + 2 if len(valores) else 0)
+    return np.maximum.accumulate(valores + base) - base
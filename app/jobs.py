@@ -0,0 +1,185 @@
+# app/jobs.py
+# Cola de reportes en segundo plano. Los reportes largos (un año de
+# asistencia, notas de una institución) se ejecutan en un pool de hilos
+# propio, pequeño y acotado, para que no acaparen las conexiones que usan
+# los endpoints transaccionales. El resultado se guarda como archivo JSON.
+#
+# El estado de los trabajos vive en memoria del proceso: con varios workers
+# de uvicorn, el estado y la descarga se consultan en el mismo worker que
+# recibió el trabajo (o se usa un único worker para /reportes/jobs).
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app import notas, reports
+from app.db import DB_POOL_SYNC_MAX
+
+# ================================
+#  CONFIGURACIÓN
+# ================================
+# Nunca más de la mitad del pool síncrono para reportes en segundo plano.
+REPORT_JOB_WORKERS = max(1, min(int(os.getenv("REPORT_JOB_WORKERS", "2")), DB_POOL_SYNC_MAX // 2))
+REPORT_JOB_MAX_PENDING = int(os.getenv("REPORT_JOB_MAX_PENDING", "50"))
+REPORT_JOB_RETENTION = int(os.getenv("REPORT_JOB_RETENTION", str(24 * 3600)))   # segundos
+REPORT_JOB_DIR = os.getenv("REPORT_JOB_DIR", os.path.join(tempfile.gettempdir(), "globalenglish_reportes"))
+
+# tipo → función de reports/notas que lo calcula (kwargs = params del trabajo)
+TIPOS = {
+    "asistencia_aula": reports.reporte_asistencia_aula,
+    "asistencia_tutor": reports.reporte_asistencia_tutor,
+    "resumen_semanal": reports.reporte_resumen_semanal,
+    "notas": notas.reporte_notas,
+    "auditoria_sesiones": reports.auditoria_sesiones,
+}
+
+ESTADOS_FINALES = ("TERMINADO", "ERROR")
+
+
+class ColaLlena(Exception):
+    pass
+
+
+# ================================
+#  TRABAJOS
+# ================================
+_executor = None
+_executor_lock = threading.Lock()
+_trabajos = {}            # id_job → dict de estado
+_trabajos_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix="reporte")
+        return _executor
+
+
+def _ruta(id_job: str) -> str:
+    return os.path.join(REPORT_JOB_DIR, f"{id_job}.json")
+
+
+def _vista(job: dict) -> dict:
+    """Estado público del trabajo (sin la ruta del archivo)."""
+    return {k: v for k, v in job.items() if k != "archivo" and not k.startswith("_")}
+
+
+def _actualizar(id_job: str, **cambios):
+    with _trabajos_lock:
+        _trabajos[id_job].update(cambios)
+
+
+def _ejecutar(id_job: str, tipo: str, params: dict):
+    _actualizar(id_job, estado="EJECUTANDO", iniciado_en=datetime.now().isoformat(timespec="seconds"))
+    inicio = time.monotonic()
+    try:
+        resultado = TIPOS[tipo](**params)
+        os.makedirs(REPORT_JOB_DIR, exist_ok=True)
+        ruta = _ruta(id_job)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, default=str)
+        os.replace(ruta + ".tmp", ruta)   # la descarga nunca ve un archivo a medias
+        _actualizar(
+            id_job,
+            estado="TERMINADO",
+            archivo=ruta,
+            bytes=os.path.getsize(ruta),
+            filas=len(resultado) if isinstance(resultado, list) else None,
+        )
+    except Exception as e:
+        _actualizar(id_job, estado="ERROR", error=str(e))
+    finally:
+        _actualizar(
+            id_job,
+            terminado_en=datetime.now().isoformat(timespec="seconds"),
+            duracion_s=round(time.monotonic() - inicio, 3),
+            _fin=time.monotonic(),
+        )
+
+
+def _purgar():
+    """Olvida trabajos terminados hace más de REPORT_JOB_RETENTION y borra sus archivos."""
+    limite = time.monotonic() - REPORT_JOB_RETENTION
+    with _trabajos_lock:
+        viejos = [j for j in _trabajos.values() if j.get("_fin") and j["_fin"] < limite]
+        for job in viejos:
+            del _trabajos[job["id_job"]]
+    for job in viejos:
+        if job.get("archivo"):
+            try:
+                os.remove(job["archivo"])
+            except OSError:
+                pass
+
+
+def enviar(tipo: str, params: dict, id_propietario: int) -> dict:
+    """
+    Encola un reporte. Lanza ValueError si el tipo no existe y ColaLlena si
+    ya hay REPORT_JOB_MAX_PENDING trabajos sin terminar.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de reporte no soportado: {tipo}")
+    _purgar()
+
+    id_job = secrets.token_urlsafe(12)
+    job = {
+        "id_job": id_job,
+        "tipo": tipo,
+        "params": params,
+        "id_propietario": id_propietario,
+        "estado": "EN_COLA",
+        "creado_en": datetime.now().isoformat(timespec="seconds"),
+    }
+    with _trabajos_lock:
+        pendientes = sum(1 for j in _trabajos.values() if j["estado"] not in ESTADOS_FINALES)
+        if pendientes >= REPORT_JOB_MAX_PENDING:
+            raise ColaLlena(f"Hay {pendientes} reportes en cola; intente más tarde.")
+        _trabajos[id_job] = job
+
+    _get_executor().submit(_ejecutar, id_job, tipo, params)
+    return _vista(job)
+
+
+def estado(id_job: str) -> dict | None:
+    with _trabajos_lock:
+        job = _trabajos.get(id_job)
+        return _vista(job) if job else None
+
+
+def archivo(id_job: str) -> str | None:
+    """Ruta del resultado si el trabajo terminó bien."""
+    with _trabajos_lock:
+        job = _trabajos.get(id_job)
+        return job.get("archivo") if job and job["estado"] == "TERMINADO" else None
+
+
+def listar(id_propietario: int | None = None) -> list:
+    """Trabajos del propietario (todos si es None), más recientes primero."""
+    with _trabajos_lock:
+        jobs = [_vista(j) for j in _trabajos.values()
+                if id_propietario is None or j["id_propietario"] == id_propietario]
+    return sorted(jobs, key=lambda j: j["creado_en"], reverse=True)
+
+
+def stats() -> dict:
+    with _trabajos_lock:
+        por_estado = {}
+        for j in _trabajos.values():
+            por_estado[j["estado"]] = por_estado.get(j["estado"], 0) + 1
+    return {
+        "workers": REPORT_JOB_WORKERS,
+        "max_pendientes": REPORT_JOB_MAX_PENDING,
+        "por_estado": por_estado,
+    }
+
+
+def shutdown():
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
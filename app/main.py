@@ -1,18 +1,34 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, FileResponse, ORJSONResponse
+from typing import Optional, Literal
+from datetime import timezone
+from email.utils import format_datetime
 from app import models
 from app.auth import (
     create_token,
     get_current_user,
     requires_role,
-    get_person_id_to_act_on
+    get_person_id_to_act_on,
+    get_role_level,
+    token_cache_stats
 )
 from app import crud
+from app import db
+from app import crud_async
+from app import exports
+from app import cache
+from app import notas
+from app import jobs
+from app import nomina
+from app import reports
+from app.utils import decode_cursor
 
 app = FastAPI(
     title="Sistema Programa Niños y Jóvenes Globales",
     description="Backend oficial del proyecto académico basado en FastAPI",
-    version="1.0"
+    version="1.0",
+    default_response_class=ORJSONResponse
 )
 
 # =====================================================
@@ -26,19 +42,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+async def cerrar_pool_async():
+    await db.close_pool_async()
+    jobs.shutdown()
+
+
+# =====================================================
+#   PAGINACIÓN (cursor opaco + limit)
+# =====================================================
+
+class Paginacion:
+    """Parámetros comunes de los listados paginados por clave."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor devuelto como next_cursor por la página anterior."),
+        limit: int = Query(100, ge=1, le=500)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+    def after(self, forma=int):
+        """Clave de la última fila vista, validada contra la forma del listado (400 si no)."""
+        try:
+            return decode_cursor(self.cursor, forma)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido.")
+
+
+def _json(contenido) -> ORJSONResponse:
+    """
+    Respuesta ya serializada para listados y reportes grandes: FastAPI no
+    pasa el contenido por jsonable_encoder ni lo valida contra el
+    response_model (que queda solo para documentar la forma).
+    """
+    return ORJSONResponse(contenido)
+
+
+def _condicional(request: Request, tablas: tuple, leer) -> Response:
+    """
+    GET condicional para listados de referencia. ETag y Last-Modified salen de
+    VERSION_TABLA (una lectura por PK, compartida entre workers): si el cliente
+    ya tiene esa versión responde 304 sin llamar a `leer`. Si la versión en la
+    BD cambió desde la última vista por este proceso, su cache de la tabla se
+    vacía antes de leer. Sin fila en VERSION_TABLA no hay encabezados condicionales.
+    """
+    versiones = crud.versiones_tablas(tablas)
+    if set(versiones) != set(tablas):
+        return _json(leer())
+
+    for tabla, (version, _) in versiones.items():
+        cache.alinear_version(tabla, version)
+    etag = 'W/"' + "-".join(f"{t}.{versiones[t][0]}" for t in tablas) + '"'
+    modificado = max(m for _, m in versiones.values()).replace(tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modificado, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    recibidos = [e.strip() for e in request.headers.get("if-none-match", "").split(",")]
+    if etag in recibidos or "*" in recibidos:
+        return Response(status_code=304, headers=headers)
+    respuesta = _json(leer())
+    respuesta.headers.update(headers)
+    return respuesta
+
 # =====================================================
 #   ENDPOINTS DE AUTENTICACIÓN
 # =====================================================
 
 @app.post("/login")
-def login(data: models.UsuarioLogin):
-    usuario = crud.login(data.nombre_user, data.contrasena)
+async def login(data: models.UsuarioLogin):
+    usuario = await crud_async.login(data.nombre_user, data.contrasena)
 
     if not usuario:
         raise HTTPException(status_code=401, detail="Usuario o contraseña incorrectos.")
 
     token = create_token({
-        "id_usuario": usuario["id_usuario"],
+        "id_usuario": usuario["nombre_user"],   # USUARIO tiene como PK nombre_user
         "id_persona": usuario["id_persona"],
         "rol": usuario["rol"]
     })
@@ -52,12 +135,12 @@ def login(data: models.UsuarioLogin):
 
 @app.post("/roles", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
 def crear_rol(data: models.RolBase):
-    return crud.crear_rol(data)
+    return crud.crear_rol(data.model_dump())
 
 
-@app.get("/roles", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
-def listar_roles():
-    return crud.listar_roles()
+@app.get("/roles", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))], response_model=list[models.RolOut])
+def listar_roles(request: Request):
+    return _condicional(request, ("ROL",), crud.listar_roles)
 
 
 # =====================================================
@@ -66,12 +149,12 @@ def listar_roles():
 
 @app.post("/tipo-documento", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
 def crear_tipo_doc(data: models.TipoDocumentoBase):
-    return crud.crear_tipo_documento(data)
+    return crud.crear_tipo_documento(data.model_dump())
 
 
-@app.get("/tipo-documento", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
-def listar_tipo_doc():
-    return crud.listar_tipo_documento()
+@app.get("/tipo-documento", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))], response_model=list[models.TipoDocumentoOut])
+def listar_tipo_doc(request: Request):
+    return _condicional(request, ("TIPO_DOCUMENTO",), crud.listar_tipo_documento)
 
 
 # =====================================================
@@ -83,11 +166,21 @@ def crear_persona(data: models.PersonaCreate):
     return crud.crear_persona(data)
 
 
+@app.post("/persona/bulk", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def crear_personas_bulk(data: list[models.PersonaBulkIn]):
+    return crud.create_personas_bulk([d.model_dump() for d in data])
+
+
 @app.put("/persona/{id_persona}", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def actualizar_persona(id_persona: int, data: models.PersonaUpdate):
     return crud.actualizar_persona(id_persona, data)
 
 
+@app.get("/persona", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))], response_model=models.Pagina[models.PersonaOut])
+def listar_personas(pag: Paginacion = Depends()):
+    return _json(crud.list_personas(pag.limit, pag.after()))
+
+
 @app.get("/persona/{id_persona}")
 def obtener_persona(id_persona: int):
     return crud.obtener_persona(id_persona)
@@ -102,6 +195,11 @@ def crear_usuario(data: models.UsuarioCreate):
     return crud.crear_usuario(data)
 
 
+@app.get("/usuario", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))], response_model=models.Pagina[models.UsuarioOut])
+def listar_usuarios(pag: Paginacion = Depends()):
+    return _json(crud.list_usuarios(pag.limit, pag.after(str)))
+
+
 @app.get("/usuario/{id_usuario}", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
 def obtener_usuario(id_usuario: int):
     return crud.obtener_usuario(id_usuario)
@@ -116,9 +214,11 @@ def crear_institucion(data: models.InstitucionCreate):
     return crud.crear_institucion(data)
 
 
-@app.get("/institucion", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
-def listar_instituciones():
-    return crud.listar_instituciones()
+@app.get("/institucion", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))], response_model=models.Pagina[models.InstitucionOut])
+def listar_instituciones(request: Request, pag: Paginacion = Depends()):
+    after_id = pag.after()
+    return _condicional(request, ("INSTITUCION",),
+                        lambda: crud.list_instituciones(pag.limit, after_id))
 
 
 # =====================================================
@@ -135,9 +235,11 @@ def actualizar_sede(id_sede: int, id_institucion: int, data: models.SedeUpdate):
     return crud.actualizar_sede(id_sede, id_institucion, data)
 
 
-@app.get("/sede/{id_institucion}")
-def listar_sedes(id_institucion: int):
-    return crud.listar_sedes(id_institucion)
+@app.get("/sede/{id_institucion}", response_model=models.Pagina[models.SedeOut])
+def listar_sedes(request: Request, id_institucion: int, pag: Paginacion = Depends()):
+    after_id = pag.after((int, int))
+    return _condicional(request, ("SEDE",),
+                        lambda: crud.list_sedes(pag.limit, after_id, id_institucion))
 
 
 # =====================================================
@@ -149,9 +251,16 @@ def crear_aula(data: models.AulaCreate):
     return crud.crear_aula(data)
 
 
-@app.get("/aula/{id_institucion}")
-def listar_aulas(id_institucion: int):
-    return crud.listar_aulas(id_institucion)
+@app.post("/aula/bulk", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def crear_aulas_bulk(data: list[models.AulaCreate]):
+    return crud.create_aulas_bulk([d.model_dump() for d in data])
+
+
+@app.get("/aula/{id_institucion}", response_model=models.Pagina[models.AulaOut])
+def listar_aulas(request: Request, id_institucion: int, pag: Paginacion = Depends()):
+    after_id = pag.after()
+    return _condicional(request, ("AULA",),
+                        lambda: crud.list_aulas(pag.limit, after_id, id_institucion))
 
 
 # =====================================================
@@ -163,9 +272,63 @@ def crear_horario(data: models.HorarioCreate):
     return crud.crear_horario(data)
 
 
+@app.post("/horario/bulk", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def crear_horarios_bulk(data: list[models.HorarioCreate]):
+    return crud.create_horarios_bulk([d.model_dump() for d in data])
+
+
+@app.get("/horario", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))], response_model=models.Pagina[models.HorarioOut])
+def listar_horarios(pag: Paginacion = Depends()):
+    return _json(crud.list_horarios(pag.limit, pag.after()))
+
+
 @app.post("/horario/asignar", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def asignar_horario(data: models.AsignarHorarioAula):
-    return crud.asignar_horario(data)
+    return crud.asignar_horario_aula(data.model_dump(mode="json"))
+
+
+@app.post("/horario/asignar/bulk", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def asignar_horarios_bulk(data: list[models.AsignarHorarioAula], solo_validar: bool = False):
+    return crud.asignar_horarios_aula_bulk([d.model_dump(mode="json") for d in data], solo_validar)
+
+
+# =====================================================
+#   MOTIVOS DE INASISTENCIA Y FESTIVOS
+# =====================================================
+
+@app.get("/motivo-inasistencia", dependencies=[Depends(requires_role(["TUTOR"]))], response_model=list[models.MotivoNoAsistenciaOut])
+def listar_motivos():
+    return crud.list_motivos_inasistencia()
+
+
+@app.post("/motivo-inasistencia", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def crear_motivo(data: models.MotivoNoAsistenciaIn):
+    return crud.create_motivo_inasistencia(data.model_dump())
+
+
+@app.put("/motivo-inasistencia/{id_motivo}", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def actualizar_motivo(id_motivo: int, data: models.MotivoNoAsistenciaIn):
+    return crud.update_motivo_inasistencia(id_motivo, data.model_dump())
+
+
+@app.delete("/motivo-inasistencia/{id_motivo}", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def eliminar_motivo(id_motivo: int):
+    return crud.delete_motivo_inasistencia(id_motivo)
+
+
+@app.get("/festivo", dependencies=[Depends(requires_role(["TUTOR"]))], response_model=list[models.FestivoOut])
+def listar_festivos(anio: Optional[int] = None):
+    return crud.list_festivos(anio)
+
+
+@app.post("/festivo", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def crear_festivo(data: models.FestivoIn):
+    return crud.create_festivo(data.model_dump())
+
+
+@app.delete("/festivo/{id_festivo}", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def eliminar_festivo(id_festivo: int):
+    return crud.delete_festivo(id_festivo)
 
 
 # =====================================================
@@ -174,12 +337,17 @@ def asignar_horario(data: models.AsignarHorarioAula):
 
 @app.post("/tutor/asignar", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def asignar_tutor(data: models.TutorAulaAssign):
-    return crud.asignar_tutor_aula(data)
+    return crud.asignar_tutor_aula(data.model_dump(mode="json"))
 
 
 @app.post("/tutor/desasignar", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def remover_tutor(data: models.TutorAulaUnassign):
-    return crud.remover_tutor_de_aula(data)
+    return crud.remover_tutor_de_aula(data.model_dump(mode="json"))
+
+
+@app.get("/tutor/activo/{id_aula}", dependencies=[Depends(requires_role(["TUTOR"]))])
+def tutor_activo(id_aula: int):
+    return crud.get_tutor_activo(id_aula)
 
 
 # =====================================================
@@ -191,14 +359,34 @@ def crear_estudiante(data: models.EstudianteIn):
     return crud.crear_estudiante(data)
 
 
+@app.post("/estudiante/bulk", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def crear_estudiantes_bulk(data: list[models.EstudianteIn]):
+    return crud.create_estudiantes_bulk([d.model_dump() for d in data])
+
+
 @app.post("/estudiante/ingresar", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def ingresar_estudiante_aula(data: models.HistoricoAulaEstudianteIn):
-    return crud.ingresar_estudiante_aula(data)
+    return crud.ingresar_estudiante_aula(data.model_dump(mode="json"))
 
 
 @app.post("/estudiante/mover", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
 def mover_estudiante(data: models.CambioEstudianteAulaIn):
-    return crud.mover_estudiante(data)
+    return crud.mover_estudiante(data.model_dump(mode="json"))
+
+
+@app.get("/aula/{id_aula}/estudiantes", dependencies=[Depends(requires_role(["TUTOR"]))], response_model=list[models.EstudianteRoster])
+def roster_aula(id_aula: int, fecha: Optional[str] = None):
+    """Estudiantes del aula en una fecha YYYY-MM-DD (hoy por defecto)."""
+    try:
+        return _json(crud.roster_aula(id_aula, fecha))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Fecha inválida (YYYY-MM-DD).")
+
+
+@app.get("/semana/{id_semana}/estudiantes", dependencies=[Depends(requires_role(["TUTOR"]))], response_model=models.RosterSemanaOut)
+def roster_semana(id_semana: int, id_aula: Optional[list[int]] = Query(None)):
+    """Estudiantes por aula y día de la semana; id_aula se puede repetir (sin él: todas)."""
+    return _json(crud.roster_semana(id_semana, id_aula))
 
 
 # =====================================================
@@ -206,12 +394,32 @@ def mover_estudiante(data: models.CambioEstudianteAulaIn):
 # =====================================================
 
 @app.post("/asistencia/registrar")
-def registrar_asistencia(
+async def registrar_asistencia(
     data: models.AsistenciaAulaBase,
     user=Depends(requires_role(["TUTOR"])),
     id_actor=Depends(get_person_id_to_act_on)
 ):
-    return crud.registrar_asistencia(data, id_actor)
+    return await crud_async.registrar_asistencia(data.model_dump(), id_actor)
+
+
+@app.post("/asistencia/registrar/sesion")
+async def registrar_asistencia_sesion(
+    data: models.AsistenciaSesionIn,
+    user=Depends(requires_role(["TUTOR"])),
+    id_actor=Depends(get_person_id_to_act_on)
+):
+    """Encabezado de la clase + lista de estudiantes, en una sola transacción."""
+    return await crud_async.registrar_asistencia_sesion(data.model_dump(), id_actor)
+
+
+@app.put("/asistencia/{id_asist}")
+async def corregir_asistencia(
+    id_asist: int,
+    data: models.AsistenciaAulaCorreccion,
+    user=Depends(requires_role(["TUTOR"])),
+    id_actor=Depends(get_person_id_to_act_on)
+):
+    return await crud_async.corregir_asistencia(id_asist, data.model_dump(), id_actor)
 
 
 # =====================================================
@@ -231,22 +439,202 @@ def registrar_nota(
 #   REPORTES (TUTOR o ADMINISTRATIVO con delegación)
 # =====================================================
 
-@app.get("/reportes/asistencia")
-def reporte_asistencia(
+@app.get("/reportes/asistencia", response_model=list[models.FilaAsistencia])
+async def reporte_asistencia(
     fecha_inicio: str,
     fecha_fin: str,
     user=Depends(requires_role(["TUTOR"])),
     id_actor=Depends(get_person_id_to_act_on)
 ):
-    return crud.reporte_asistencia(id_actor, fecha_inicio, fecha_fin)
+    return _json(await crud_async.reporte_asistencia_tutor(id_actor, fecha_inicio, fecha_fin))
+
 
+@app.get("/reportes/asistencia/aula/{id_aula}", dependencies=[Depends(requires_role(["TUTOR"]))], response_model=list[models.FilaAsistencia])
+async def reporte_asistencia_aula(id_aula: int, id_semana: Optional[int] = None):
+    return _json(await crud_async.reporte_asistencia_aula(id_aula, id_semana))
 
-@app.get("/reportes/notas")
+
+@app.get("/reportes/asistencia/semanal", response_model=list[models.FilaResumenSemanal])
+async def reporte_asistencia_semanal(
+    id_aula: Optional[int] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    user=Depends(requires_role(["TUTOR"])),
+    id_actor=Depends(get_person_id_to_act_on)
+):
+    """
+    Totales por semana (sesiones, dictadas, horas, reposiciones) desde el
+    rollup ASISTENCIA_SEMANAL: de un aula si se indica id_aula, si no del tutor.
+    """
+    if id_aula is not None:
+        return _json(await crud_async.reporte_resumen_semanal(
+            id_aula=id_aula, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+    return _json(await crud_async.reporte_resumen_semanal(
+        id_persona=id_actor, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin))
+
+
+@app.get("/reportes/auditoria/sesiones", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))], response_model=models.AuditoriaSesionesOut)
+def auditoria_sesiones(fecha_inicio: str, fecha_fin: str):
+    """
+    Clases dictadas sin duración válida, fuera de su horario o cruzadas con
+    otra del mismo tutor. Para un periodo completo, usar POST /reportes/jobs.
+    """
+    return _json(reports.auditoria_sesiones(fecha_inicio, fecha_fin))
+
+
+@app.get("/reportes/notas", response_model=models.ReporteNotasOut)
 def reporte_notas(
+    id_periodo: int,
+    id_aula: Optional[int] = None,
+    id_institucion: Optional[int] = None,
+    user=Depends(requires_role(["TUTOR"])),
+    id_actor=Depends(get_person_id_to_act_on)
+):
+    """
+    Definitivas, aprobación y promedios del periodo. Sin id_aula/id_institucion
+    cubre las aulas activas del tutor; esos filtros son para ADMINISTRATIVO+.
+    """
+    alcance, id_alcance = _alcance_notas(user, id_actor, id_aula, id_institucion)
+    return _json(notas.reporte_notas(alcance, id_alcance, id_periodo))
+
+
+def _alcance_notas(user, id_actor, id_aula, id_institucion):
+    if id_aula is None and id_institucion is None:
+        return "tutor", id_actor
+    if user["nivel"] < get_role_level("ADMINISTRATIVO"):
+        raise HTTPException(status_code=403, detail="Un TUTOR solo consulta las notas de sus aulas.")
+    if id_aula is not None:
+        return "aula", id_aula
+    return "institucion", id_institucion
+
+
+# =====================================================
+#   NÓMINA: HORAS DE TUTORES (ADMINISTRATIVO + ADMIN)
+# =====================================================
+
+@app.get("/nomina/horas-tutor", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))], response_model=list[models.FilaHorasTutor])
+def horas_tutores(fecha_inicio: str, fecha_fin: str, id_persona: Optional[int] = None):
+    """
+    Sesiones, minutos reales y horas equivalentes por tutor y mes. El detalle
+    diario se descarga con GET /export/horas_tutor.
+    """
+    return _json(nomina.horas_tutores(fecha_inicio, fecha_fin, id_persona))
+
+
+@app.post("/admin/nomina/recalcular", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def recalcular_horas_tutores(fecha_inicio: Optional[str] = None, fecha_fin: Optional[str] = None):
+    """Sin rango: solo días pendientes. Con rango: recalcula todos sus días."""
+    if fecha_inicio and fecha_fin:
+        return nomina.recalcular_rango(fecha_inicio, fecha_fin)
+    return nomina.recalcular_pendientes()
+
+
+# =====================================================
+#   REPORTES EN SEGUNDO PLANO
+# =====================================================
+
+def _params_job(data: models.ReporteJobIn, user, id_actor) -> dict:
+    """Parámetros de la función de reporte según el tipo (con las mismas reglas de acceso)."""
+    fi = data.fecha_inicio.isoformat() if data.fecha_inicio else None
+    ff = data.fecha_fin.isoformat() if data.fecha_fin else None
+
+    if data.tipo == "asistencia_aula":
+        if data.id_aula is None:
+            raise HTTPException(status_code=400, detail="asistencia_aula requiere id_aula.")
+        return {"id_aula": data.id_aula, "id_semana": data.id_semana}
+    if data.tipo == "asistencia_tutor":
+        if not fi or not ff:
+            raise HTTPException(status_code=400, detail="asistencia_tutor requiere fecha_inicio y fecha_fin.")
+        return {"id_persona": id_actor, "fecha_inicio": fi, "fecha_fin": ff}
+    if data.tipo == "auditoria_sesiones":
+        if user["nivel"] < get_role_level("ADMINISTRATIVO"):
+            raise HTTPException(status_code=403, detail="La auditoría de sesiones es para ADMINISTRATIVO+.")
+        if not fi or not ff:
+            raise HTTPException(status_code=400, detail="auditoria_sesiones requiere fecha_inicio y fecha_fin.")
+        return {"fecha_inicio": fi, "fecha_fin": ff}
+    if data.tipo == "resumen_semanal":
+        if data.id_aula is not None:
+            return {"id_aula": data.id_aula, "fecha_inicio": fi, "fecha_fin": ff}
+        return {"id_persona": id_actor, "fecha_inicio": fi, "fecha_fin": ff}
+    # notas
+    if data.id_periodo is None:
+        raise HTTPException(status_code=400, detail="notas requiere id_periodo.")
+    alcance, id_alcance = _alcance_notas(user, id_actor, data.id_aula, data.id_institucion)
+    return {"alcance": alcance, "id_alcance": id_alcance, "id_periodo": data.id_periodo}
+
+
+def _job_visible(id_job: str, user) -> dict:
+    job = jobs.estado(id_job)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado.")
+    if job["id_propietario"] != user["id_persona"] and user["rol"] != "ADMINISTRADOR":
+        raise HTTPException(status_code=403, detail="El trabajo pertenece a otro usuario.")
+    return job
+
+
+@app.post("/reportes/jobs", status_code=202, response_model=models.ReporteJobOut)
+def encolar_reporte(
+    data: models.ReporteJobIn,
     user=Depends(requires_role(["TUTOR"])),
     id_actor=Depends(get_person_id_to_act_on)
 ):
-    return crud.reporte_notas(id_actor)
+    """Encola un reporte largo; el resultado se consulta en /reportes/jobs/{id_job}."""
+    try:
+        return jobs.enviar(data.tipo, _params_job(data, user, id_actor), user["id_persona"])
+    except jobs.ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@app.get("/reportes/jobs", response_model=list[models.ReporteJobOut])
+def listar_reportes_encolados(user=Depends(requires_role(["TUTOR"]))):
+    return jobs.listar(user["id_persona"])
+
+
+@app.get("/reportes/jobs/{id_job}", response_model=models.ReporteJobOut)
+def estado_reporte(id_job: str, user=Depends(requires_role(["TUTOR"]))):
+    return _job_visible(id_job, user)
+
+
+@app.get("/reportes/jobs/{id_job}/descarga")
+def descargar_reporte(id_job: str, user=Depends(requires_role(["TUTOR"]))):
+    job = _job_visible(id_job, user)
+    ruta = jobs.archivo(id_job)
+    if ruta is None:
+        raise HTTPException(status_code=409, detail=f"El reporte aún no está disponible (estado {job['estado']}).")
+    return FileResponse(ruta, media_type="application/json", filename=f"{job['tipo']}_{id_job}.json")
+
+
+# =====================================================
+#   EXPORTACIONES MASIVAS (ADMINISTRATIVO + ADMIN)
+# =====================================================
+
+@app.get("/export/{tabla}", dependencies=[Depends(requires_role(["ADMINISTRATIVO"]))])
+def exportar_tabla(
+    tabla: str,
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None
+):
+    """
+    Descarga persona, estudiante, asistencia_aula, horas_tutor o nota_estudiante
+    completas en streaming (memoria constante). asistencia_aula y horas_tutor
+    admiten rango de fechas.
+    """
+    try:
+        exports.validar(tabla, formato, fecha_inicio, fecha_fin)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if tabla.lower() == "horas_tutor":
+        nomina.recalcular_pendientes()
+    # La consulta se ejecuta aquí: un error de la BD sale como 500, no como descarga truncada
+    contenido = exports.exportar(tabla, formato, fecha_inicio, fecha_fin)
+
+    return StreamingResponse(
+        contenido,
+        media_type=exports.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{tabla.lower()}.{formato}"'}
+    )
 
 
 # =====================================================
@@ -255,4 +643,33 @@ def reporte_notas(
 
 @app.post("/semanas", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
 def crear_semana(data: models.SemanaCreate):
-    return crud.crear_semana(data) este es el main 
+    return crud.crear_semana(data)
+
+
+# =====================================================
+#   MONITOREO (ADMINISTRADOR)
+# =====================================================
+
+@app.get("/admin/pool", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def estado_pool():
+    return db.pool_stats()
+
+
+@app.post("/admin/asistencia-semanal/reconstruir", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def reconstruir_asistencia_semanal(id_semana: Optional[int] = None):
+    return crud.reconstruir_asistencia_semanal(id_semana)
+
+
+@app.post("/admin/asignaciones-activas/verificar", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def verificar_asignaciones_activas(reparar: bool = False):
+    return crud.verificar_asignaciones_activas(reparar)
+
+
+@app.get("/admin/jobs", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def estado_jobs():
+    return jobs.stats()
+
+
+@app.get("/admin/cache", dependencies=[Depends(requires_role(["ADMINISTRADOR"]))])
+def estado_cache():
+    return {**cache.stats(), "JWT": token_cache_stats()}
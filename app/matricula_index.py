@@ -0,0 +1,198 @@
+# app/matricula_index.py
+import os
+import threading
+import time
+from datetime import date
+from app.db import get_conn
+
+# ================================
+#  CONFIGURACIÓN
+# ================================
+# Segundos antes de recargar HISTORICO_AULA_ESTUDIANTE completo (cambios de
+# otros workers); en este proceso ingresar/mover estudiante lo actualizan al instante.
+ROSTER_INDEX_TTL = int(os.getenv("ROSTER_INDEX_TTL", "300"))
+
+SQL_MATRICULAS = """
+    SELECT id_hist_aula_est, id_estudiante, id_aula, fecha_inicio, fecha_fin
+    FROM HISTORICO_AULA_ESTUDIANTE
+"""
+
+# fecha_fin NULL = matrícula abierta
+_SIN_FIN = date.max.toordinal()
+
+
+def _ordinal(fecha) -> int:
+    if fecha is None:
+        return _SIN_FIN
+    if isinstance(fecha, date):  # incluye datetime
+        return fecha.toordinal()
+    return date.fromisoformat(str(fecha)[:10]).toordinal()
+
+
+# ================================
+#  ÁRBOL DE INTERVALOS DE UN AULA
+# ================================
+
+class IntervalTree:
+    """
+    Árbol de intervalos estático sobre un arreglo ordenado por inicio.
+    El nodo de cada subrango [l, r) es su punto medio y guarda el fin máximo
+    del subrango, así que las ramas que terminan antes de la consulta se
+    descartan sin recorrerlas.
+
+    Los intervalos son [inicio, fin) en ordinales de fecha: fecha_fin es el
+    día en que el estudiante deja el aula (mover_estudiante usa esa misma
+    fecha como inicio en el aula destino).
+    """
+    __slots__ = ("items", "inicios", "max_fin")
+
+    def __init__(self, items=()):
+        # items: (inicio, fin, id_hist, id_estudiante)
+        self.items = sorted(items)
+        self.inicios = [it[0] for it in self.items]
+        self.max_fin = [0] * len(self.items)
+        self._construir(0, len(self.items))
+
+    def _construir(self, l, r) -> int:
+        if l >= r:
+            return 0
+        m = (l + r) // 2
+        self.max_fin[m] = max(self.items[m][1], self._construir(l, m), self._construir(m + 1, r))
+        return self.max_fin[m]
+
+    def solapados(self, ini: int, fin: int) -> list:
+        """Intervalos que se cruzan con [ini, fin)."""
+        encontrados = []
+        self._buscar(0, len(self.items), ini, fin, encontrados)
+        return encontrados
+
+    def _buscar(self, l, r, ini, fin, encontrados):
+        if l >= r:
+            return
+        m = (l + r) // 2
+        if self.max_fin[m] <= ini:
+            return  # todo el subrango termina antes de la consulta
+        self._buscar(l, m, ini, fin, encontrados)
+        if self.items[m][0] >= fin:
+            return  # a la derecha todos empiezan después de la consulta
+        if self.items[m][1] > ini:
+            encontrados.append(self.items[m])
+        self._buscar(m + 1, r, ini, fin, encontrados)
+
+    def con_cambio(self, agregar=(), cerrar=None) -> "IntervalTree":
+        """Nuevo árbol con intervalos agregados y/o cerrados ({id_hist: fin})."""
+        cerrar = cerrar or {}
+        items = [
+            (it[0], cerrar[it[2]], it[2], it[3]) if it[2] in cerrar else it
+            for it in self.items
+        ]
+        return IntervalTree(items + list(agregar))
+
+
+# ================================
+#  ÍNDICE GLOBAL (todas las aulas)
+# ================================
+
+class RosterIndex:
+    """
+    Matrículas (HISTORICO_AULA_ESTUDIANTE) de todas las aulas, cargadas con
+    una sola consulta, con un árbol de intervalos por aula para responder
+    "¿qué estudiantes había en el aula X el día D?" sin ir a la BD.
+    """
+
+    def __init__(self, ttl: int = ROSTER_INDEX_TTL):
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._aulas = {}       # id_aula → IntervalTree
+        self._historial = {}   # id_hist → id_aula
+        self._cargado_en = None
+
+    def vigente(self) -> bool:
+        return self._cargado_en is not None and time.monotonic() - self._cargado_en <= self._ttl
+
+    def _cargar(self):
+        conn = get_conn()
+        cur = conn.cursor()
+        try:
+            cur.arraysize = 5000
+            cur.execute(SQL_MATRICULAS)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        self.cargar_desde(rows)
+
+    def cargar_desde(self, rows):
+        """Reconstruye el índice con filas de SQL_MATRICULAS."""
+        por_aula, historial = {}, {}
+        for id_hist, id_est, id_aula, f_ini, f_fin in rows:
+            por_aula.setdefault(id_aula, []).append((_ordinal(f_ini), _ordinal(f_fin), id_hist, id_est))
+            historial[id_hist] = id_aula
+
+        aulas = {id_aula: IntervalTree(items) for id_aula, items in por_aula.items()}
+        with self._lock:
+            self._aulas, self._historial = aulas, historial
+            self._cargado_en = time.monotonic()
+
+    def _asegurar_vigente(self):
+        if not self.vigente():
+            self._cargar()
+
+    def _arbol(self, id_aula):
+        self._asegurar_vigente()
+        return self._aulas.get(id_aula)
+
+    def roster(self, id_aula: int, fecha) -> list:
+        """IDs de estudiantes matriculados en el aula en `fecha` (ordenados)."""
+        d = _ordinal(fecha)
+        with self._lock:
+            arbol = self._arbol(id_aula)
+        if arbol is None:
+            return []
+        return sorted({it[3] for it in arbol.solapados(d, d + 1)})
+
+    def roster_rango(self, id_aulas, fecha_inicio, fecha_fin) -> dict:
+        """
+        {id_aula: {'YYYY-MM-DD': [id_estudiante, ...]}} para cada día de
+        [fecha_inicio, fecha_fin]. Con id_aulas=None incluye todas las aulas
+        que tienen historial.
+        """
+        ini, fin = _ordinal(fecha_inicio), _ordinal(fecha_fin)
+        with self._lock:
+            self._asegurar_vigente()
+            if id_aulas is None:
+                id_aulas = list(self._aulas)
+            arboles = {a: self._aulas.get(a) for a in id_aulas}
+
+        dias = [(d, date.fromordinal(d).isoformat()) for d in range(ini, fin + 1)]
+        resultado = {}
+        for id_aula, arbol in arboles.items():
+            candidatos = arbol.solapados(ini, fin + 1) if arbol else []
+            resultado[id_aula] = {
+                iso: sorted({it[3] for it in candidatos if it[0] <= d < it[1]})
+                for d, iso in dias
+            }
+        return resultado
+
+    def agregar(self, id_hist, id_estudiante, id_aula, fecha_inicio, fecha_fin=None):
+        with self._lock:
+            if self._cargado_en is None or id_hist in self._historial:
+                return  # Se verá en la próxima carga completa
+            item = (_ordinal(fecha_inicio), _ordinal(fecha_fin), id_hist, id_estudiante)
+            arbol = self._aulas.get(id_aula) or IntervalTree()
+            self._aulas[id_aula] = arbol.con_cambio(agregar=[item])
+            self._historial[id_hist] = id_aula
+
+    def cerrar(self, id_hist, fecha_fin):
+        with self._lock:
+            id_aula = self._historial.get(id_hist)
+            if id_aula is not None:
+                arbol = self._aulas[id_aula]
+                self._aulas[id_aula] = arbol.con_cambio(cerrar={id_hist: _ordinal(fecha_fin)})
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+
+roster_index = RosterIndex()
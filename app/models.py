@@ -1,7 +1,7 @@
 # app/models.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, Generic, TypeVar
 from datetime import date, time
 
 
@@ -81,8 +81,19 @@ class PersonaCreate(BaseModel):
     contratado: Literal['S', 'N'] = "S"
     perfil_tecnico: Optional[Literal['S', 'N']] = "N"  # Para ADMINISTRADOR
 
-class PersonaOut(PersonaCreate):
+class PersonaBulkIn(PersonaCreate):
+    # PERSONA.rol es NOT NULL; en la carga masiva cada fila trae su rol
+    rol: Literal['ADMINISTRADOR', 'ADMINISTRATIVO', 'TUTOR'] = 'TUTOR'
+
+class PersonaOut(BaseModel):
+    """Fila de PERSONA tal como la devuelven los listados."""
     id_persona: int
+    tipo_doc: str
+    num_documento: str
+    nombre: str
+    telefono: Optional[str] = None
+    correo: Optional[str] = None
+    rol: str
 
 
 class PersonaUpdate(BaseModel):
@@ -104,9 +115,10 @@ class UsuarioLogin(BaseModel):
     contrasena: str
 
 class UsuarioOut(BaseModel):
-    id_usuario: int
+    # USUARIO tiene como PK nombre_user; nombre/correo/rol vienen de PERSONA
     nombre_user: str
-    id_persona: int
+    nombre: str
+    correo: Optional[str] = None
     rol: Literal['ADMINISTRADOR', 'ADMINISTRATIVO', 'TUTOR']
 
 
@@ -217,7 +229,7 @@ class AsistenciaAulaBase(BaseModel):
     id_semana: int
     fecha_clase: date
     hora_inicio: time
-    hora_fin: Optional[time] = None
+    hora_fin: time              # ASISTENCIA_AULA.hora_fin es NOT NULL
     dictada: Literal['S', 'N']
     horas_dictadas: int
     reposicion: Literal['S', 'N'] = "N"
@@ -230,6 +242,16 @@ class AsistenciaAulaOut(AsistenciaAulaBase):
     id_asist: int
 
 
+class AsistenciaAulaCorreccion(BaseModel):
+    dictada: Optional[Literal['S', 'N']] = None
+    horas_dictadas: Optional[int] = None
+    reposicion: Optional[Literal['S', 'N']] = None
+    fecha_reposicion: Optional[date] = None
+    id_motivo: Optional[int] = None
+    hora_inicio: Optional[time] = None
+    hora_fin: Optional[time] = None
+
+
 class RegistrarAsistenciaEstudianteIn(BaseModel):
     id_asist: int
     id_estudiante: int
@@ -237,6 +259,17 @@ class RegistrarAsistenciaEstudianteIn(BaseModel):
     observacion: Optional[str] = None
 
 
+class AsistenciaEstudianteItem(BaseModel):
+    id_estudiante: int
+    asistio: Literal['S', 'N']
+    observacion: Optional[str] = None
+
+
+class AsistenciaSesionIn(AsistenciaAulaBase):
+    """Encabezado de la clase + asistencia de todos sus estudiantes."""
+    estudiantes: list[AsistenciaEstudianteItem] = []
+
+
 class RegistrarAsistenciaTutor(BaseModel):
     id_tutor: int
     fecha: date
@@ -280,6 +313,180 @@ class FestivoIn(BaseModel):
     recurrente: bool = False
 
 
+class MotivoNoAsistenciaOut(BaseModel):
+    id_motivo: int
+    descripcion: str
+
+
+class FestivoOut(BaseModel):
+    id_festivo: int
+    fecha: date
+    descripcion: str
+
+
+# ============================
+# REPORTES EN SEGUNDO PLANO
+# ============================
+
+class ReporteJobIn(BaseModel):
+    tipo: Literal['asistencia_aula', 'asistencia_tutor', 'resumen_semanal', 'notas', 'auditoria_sesiones']
+    id_aula: Optional[int] = None
+    id_semana: Optional[int] = None
+    id_institucion: Optional[int] = None
+    id_periodo: Optional[int] = None
+    fecha_inicio: Optional[date] = None
+    fecha_fin: Optional[date] = None
+
+
+class ReporteJobOut(BaseModel):
+    id_job: str
+    tipo: str
+    params: dict
+    id_propietario: int
+    estado: Literal['EN_COLA', 'EJECUTANDO', 'TERMINADO', 'ERROR']
+    creado_en: str
+    iniciado_en: Optional[str] = None
+    terminado_en: Optional[str] = None
+    duracion_s: Optional[float] = None
+    bytes: Optional[int] = None
+    filas: Optional[int] = None
+    error: Optional[str] = None
+
+
+# ============================
+# RESPUESTAS DE LISTADOS Y REPORTES
+# ============================
+# Documentan la forma de las respuestas grandes. Esos endpoints devuelven
+# la respuesta JSON ya armada (main._json), así que FastAPI no vuelve a
+# validar fila por fila contra estos modelos.
+
+T = TypeVar("T")
+
+
+class Pagina(BaseModel, Generic[T]):
+    """Página de un listado por cursor (crud._pagina)."""
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+class EstudianteRoster(BaseModel):
+    id_estudiante: int
+    num_documento: str
+    nombres: str
+    apellidos: Optional[str] = None
+
+
+class RosterSemanaOut(BaseModel):
+    id_semana: int
+    fecha_inicio: date
+    fecha_fin: date
+    aulas: dict
+
+
+class FilaAsistencia(BaseModel):
+    """Fila de /reportes/asistencia*; fechas 'YYYY-MM-DD' y horas 'HH:MM' ('' si no hay)."""
+    nombre_inst: str
+    id_aula: int
+    id_asist: int
+    fecha_clase: str
+    hora_inicio: str
+    dia_semana: Optional[str] = None
+    h_inicio: str
+    h_final: str
+    dictada: Literal['S', 'N']
+    horas_dictadas: Optional[int] = None
+    motivo: Optional[str] = None
+    reposicion: Optional[Literal['S', 'N']] = None
+    fecha_reposicion: str
+    id_tutor_persona: Optional[int] = None
+    id_motivo: Optional[int] = None
+    es_festivo: Literal['S', 'N']
+
+
+class FilaResumenSemanal(BaseModel):
+    id_aula: int
+    id_semana: int
+    numero_semana: Optional[int] = None
+    fecha_inicio: Optional[str] = None
+    fecha_fin: Optional[str] = None
+    id_tutor_aula: int
+    id_tutor_persona: Optional[int] = None
+    sesiones: int
+    sesiones_dictadas: int
+    horas_dictadas: int
+    reposiciones: int
+    sesiones_festivo: int
+
+
+class ObservacionSesion(BaseModel):
+    id_asist: int
+    id_aula: int
+    id_tutor_persona: Optional[int] = None
+    fecha_clase: Optional[str] = None
+    hora_inicio: Optional[str] = None
+    hora_fin: Optional[str] = None
+    problemas: list[Literal['SIN_DURACION', 'FUERA_DE_HORARIO', 'CRUCE_TUTOR']]
+
+
+class AuditoriaSesionesOut(BaseModel):
+    sesiones: int
+    minutos_dictados: int
+    observaciones: list[ObservacionSesion]
+
+
+class ComponenteNotas(BaseModel):
+    id_componente: int
+    nombre: str
+    porcentaje: Optional[float] = None
+    promedio: Optional[float] = None
+    registradas: int
+
+
+class EstudianteNotas(BaseModel):
+    id_estudiante: int
+    id_aula: int
+    nombres: str
+    apellidos: Optional[str] = None
+    notas: dict[int, Optional[float]]
+    definitiva: float
+    aprobado: bool
+    completo: bool
+
+
+class AulaNotas(BaseModel):
+    id_aula: int
+    estudiantes: int
+    promedio: float
+    aprobados: int
+
+
+class ResumenNotas(BaseModel):
+    estudiantes: int
+    promedio: Optional[float] = None
+    aprobados: int
+    reprobados: int
+    nota_aprobatoria: float
+    por_aula: list[AulaNotas]
+
+
+class ReporteNotasOut(BaseModel):
+    id_periodo: int
+    componentes: list[ComponenteNotas]
+    estudiantes: list[EstudianteNotas]
+    resumen: ResumenNotas
+
+
+class FilaHorasTutor(BaseModel):
+    id_persona: int
+    nombre_tutor: str
+    mes: str
+    aulas: int
+    sesiones: int
+    horas_dictadas: int
+    minutos_reales: int
+    horas_equivalentes: float
+
+
 # ============================
 # ACCIÓN DELEGADA
 # ============================
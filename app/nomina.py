@@ -0,0 +1,203 @@
+# app/nomina.py
+# Libro de horas de tutores (LIBRO_HORAS_TUTOR): minutos reales y horas
+# equivalentes por tutor, aula y día, calculados desde ASISTENCIA_AULA y
+# HORARIO. Registrar o corregir asistencia marca el día en
+# LIBRO_HORAS_PENDIENTE; solo esos días se recalculan.
+import numpy as np
+from app.db import get_conn
+from app.horario_index import MINUTOS_EQUIV_DEFECTO
+from app.rows import as_dicts
+from app.intervalos import duraciones
+
+# Marca como pendiente el día de la fila :id_asist (misma transacción que la escritura).
+# Si el día ya estaba marcado lo actualiza igual: así la escritura bloquea la
+# marca hasta su commit y el recálculo no puede borrarla sin ver la fila nueva
+# (SKIP LOCKED la salta, o la escritura espera y su MERGE se reinicia después
+# del DELETE e inserta una marca nueva).
+SQL_MARCAR_PENDIENTE = """
+    MERGE INTO LIBRO_HORAS_PENDIENTE p
+    USING (SELECT TRUNC(fecha_clase) AS fecha FROM ASISTENCIA_AULA WHERE id_asist = :id_asist) d
+    ON (p.fecha = d.fecha)
+    WHEN MATCHED THEN UPDATE SET p.marcado_en = SYSDATE
+    WHEN NOT MATCHED THEN INSERT (fecha, marcado_en) VALUES (d.fecha, SYSDATE)
+"""
+
+# Clases dictadas de los días indicados, con horas en minutos desde medianoche.
+_SQL_CLASES = """
+    SELECT at.id_persona,
+           aa.id_aula,
+           TRUNC(aa.fecha_clase) - DATE '1970-01-01' AS dia,
+           TO_NUMBER(SUBSTR(aa.hora_inicio, 1, 2)) * 60 + TO_NUMBER(SUBSTR(aa.hora_inicio, 4, 2)) AS ini,
+           NVL(TO_NUMBER(SUBSTR(aa.hora_fin, 1, 2)) * 60 + TO_NUMBER(SUBSTR(aa.hora_fin, 4, 2)), -1) AS fin,
+           NVL(aa.horas_dictadas, 0) AS horas_dictadas,
+           NVL(h.minutos_equiv, 0) AS minutos_equiv
+    FROM ASISTENCIA_AULA aa
+    JOIN ASIGNACION_TUTOR at ON aa.id_tutor_aula = at.id_tutor_aula
+    LEFT JOIN HORARIO h ON aa.id_horario = h.id_horario
+    WHERE aa.dictada = 'S'
+      AND {filtro}
+"""
+
+_EPOCA = np.datetime64("1970-01-01", "D")
+
+
+def calcular(filas: list) -> list:
+    """
+    Agrega filas de _SQL_CLASES por (id_persona, id_aula, día) con NumPy.
+    Minutos reales = hora_fin - hora_inicio; si la clase no tiene hora de fin
+    válida se usan horas_dictadas × minutos_equiv. Horas equivalentes =
+    minutos / minutos_equiv del horario (45 si no está definido).
+    """
+    if not filas:
+        return []
+    m = np.array(filas, dtype=np.int64)
+    persona, aula, dia, ini, fin, horas, equiv = m.T
+
+    equiv = np.where(equiv > 0, equiv, MINUTOS_EQUIV_DEFECTO)
+    span = duraciones(ini, fin)
+    minutos = np.where(span > 0, span, horas * equiv)
+    equivalentes = minutos / equiv
+
+    claves, grupo = np.unique(np.stack([persona, aula, dia], axis=1), axis=0, return_inverse=True)
+    grupo = grupo.ravel()
+    n = len(claves)
+    sesiones = np.bincount(grupo, minlength=n)
+    suma_horas = np.bincount(grupo, weights=horas, minlength=n)
+    suma_min = np.bincount(grupo, weights=minutos, minlength=n)
+    suma_equiv = np.round(np.bincount(grupo, weights=equivalentes, minlength=n), 2)
+
+    fechas = (_EPOCA + claves[:, 2].astype("timedelta64[D]")).astype(object)
+    return list(zip(
+        claves[:, 0].tolist(), claves[:, 1].tolist(), fechas.tolist(),
+        sesiones.tolist(), suma_horas.astype(np.int64).tolist(),
+        suma_min.astype(np.int64).tolist(), suma_equiv.tolist(),
+    ))
+
+
+def _recalcular(cur, filtro: str, params) -> int:
+    """Reescribe LIBRO_HORAS_TUTOR para los días que cumplen `filtro` (sobre una columna de fecha)."""
+    cur.arraysize = 5000
+    cur.execute(_SQL_CLASES.format(filtro=filtro.format(col="aa.fecha_clase")), params)
+    filas = calcular(cur.fetchall())
+
+    cur.execute(f"DELETE FROM LIBRO_HORAS_TUTOR WHERE {filtro.format(col='fecha')}", params)
+    if filas:
+        cur.executemany("""
+            INSERT INTO LIBRO_HORAS_TUTOR (
+                id_persona, id_aula, fecha, sesiones, horas_dictadas,
+                minutos_reales, horas_equivalentes, actualizado_en
+            ) VALUES (:1, :2, :3, :4, :5, :6, :7, SYSDATE)
+        """, filas)
+    return len(filas)
+
+
+def reconstruir(cur) -> int:
+    """
+    Recalcula LIBRO_HORAS_TUTOR completo con el cursor dado y limpia las
+    marcas pendientes. No hace commit (scripts/migrate_schema.py).
+    """
+    filas = _recalcular(cur, "{col} IS NOT NULL", {})
+    cur.execute("DELETE FROM LIBRO_HORAS_PENDIENTE")
+    return filas
+
+
+def _borrar_marcas(cur, dias: list):
+    """Borra las marcas de `dias`: solo las que el llamador tiene bloqueadas."""
+    for i in range(0, len(dias), 1000):
+        bloque = dias[i:i + 1000]
+        binds = ",".join(f":{n + 1}" for n in range(len(bloque)))
+        cur.execute(f"DELETE FROM LIBRO_HORAS_PENDIENTE WHERE fecha IN ({binds})", bloque)
+
+
+def recalcular_pendientes() -> dict:
+    """Recalcula solo los días marcados en LIBRO_HORAS_PENDIENTE."""
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        # Las marcas que tiene bloqueadas una escritura en curso se saltan:
+        # esa escritura las deja marcadas al hacer commit, para la próxima vez.
+        cur.execute("SELECT fecha FROM LIBRO_HORAS_PENDIENTE FOR UPDATE SKIP LOCKED")
+        dias = [r[0] for r in cur.fetchall()]
+        if not dias:
+            conn.rollback()
+            return {"dias": 0, "filas": 0}
+
+        filas = 0
+        for i in range(0, len(dias), 1000):
+            bloque = dias[i:i + 1000]
+            binds = ",".join(f":{n + 1}" for n in range(len(bloque)))
+            filas += _recalcular(cur, "TRUNC({col}) IN (" + binds + ")", bloque)
+        _borrar_marcas(cur, dias)
+        conn.commit()
+        return {"dias": len(dias), "filas": filas}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def recalcular_rango(fecha_inicio: str, fecha_fin: str) -> dict:
+    """Recalcula todos los días de [fecha_inicio, fecha_fin] (reconstrucción completa)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+        filtro = ("{col} >= TO_DATE(:fecha_inicio, 'YYYY-MM-DD') "
+                  "AND {col} < TO_DATE(:fecha_fin, 'YYYY-MM-DD') + 1")
+        # Espera a las escrituras en curso del rango; solo se borran las marcas
+        # bloqueadas aquí, las que aparezcan durante el cálculo quedan pendientes.
+        cur.execute(f"SELECT fecha FROM LIBRO_HORAS_PENDIENTE WHERE {filtro.format(col='fecha')} FOR UPDATE",
+                    params)
+        marcadas = [r[0] for r in cur.fetchall()]
+        filas = _recalcular(cur, filtro, params)
+        _borrar_marcas(cur, marcadas)
+        conn.commit()
+        return {"filas": filas}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def horas_tutores(fecha_inicio: str, fecha_fin: str, id_persona: int | None = None) -> list:
+    """
+    Horas por tutor y mes en el rango, leídas del libro. Antes recalcula los
+    días pendientes para que el resultado incluya las últimas correcciones.
+    """
+    recalcular_pendientes()
+
+    sql = """
+        SELECT l.id_persona,
+               p.nombre AS nombre_tutor,
+               TO_CHAR(l.fecha, 'YYYY-MM') AS mes,
+               COUNT(DISTINCT l.id_aula) AS aulas,
+               SUM(l.sesiones) AS sesiones,
+               SUM(l.horas_dictadas) AS horas_dictadas,
+               SUM(l.minutos_reales) AS minutos_reales,
+               SUM(l.horas_equivalentes) AS horas_equivalentes
+        FROM LIBRO_HORAS_TUTOR l
+        JOIN PERSONA p ON l.id_persona = p.id_persona
+        WHERE l.fecha >= TO_DATE(:fecha_inicio, 'YYYY-MM-DD')
+          AND l.fecha < TO_DATE(:fecha_fin, 'YYYY-MM-DD') + 1
+    """
+    params = {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+    if id_persona is not None:
+        sql += " AND l.id_persona = :id_persona"
+        params["id_persona"] = id_persona
+    sql += """
+        GROUP BY l.id_persona, p.nombre, TO_CHAR(l.fecha, 'YYYY-MM')
+        ORDER BY mes, p.nombre
+    """
+
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        return as_dicts(cur).fetchall()
+    finally:
+        cur.close()
+        conn.close()
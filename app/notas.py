@@ -0,0 +1,171 @@
+# app/notas.py
+import os
+import numpy as np
+from app.db import get_conn
+
+# Escala 0–5 (RegistrarNotaIn); definitiva >= NOTA_APROBATORIA aprueba.
+NOTA_APROBATORIA = float(os.getenv("NOTA_APROBATORIA", "3.0"))
+
+# ============================
+# ALCANCE DEL REPORTE
+# ============================
+# alcance → condición sobre AULA a (bind :id)
+_ALCANCES = {
+    "aula": "a.id_aula = :id",
+    "institucion": "a.id_institucion = :id",
+    "tutor": "a.id_aula IN (SELECT id_aula FROM TUTOR_AULA_ACTIVO WHERE id_persona = :id)",
+}
+
+# Una fila por (estudiante, nota del periodo); estudiantes sin notas salen
+# con id_componente NULL. Si el estudiante estuvo en varias aulas durante el
+# periodo se toma la última matrícula.
+_SQL_MATRIZ = """
+    WITH per AS (
+        SELECT fecha_inicio, fecha_fin FROM PERIODO WHERE id_periodo = :id_periodo
+    ),
+    mat AS (
+        SELECT hae.id_estudiante, hae.id_aula,
+               ROW_NUMBER() OVER (PARTITION BY hae.id_estudiante
+                                  ORDER BY hae.fecha_inicio DESC) AS rn
+        FROM HISTORICO_AULA_ESTUDIANTE hae
+        JOIN AULA a ON hae.id_aula = a.id_aula
+        CROSS JOIN per
+        WHERE {alcance}
+          AND (per.fecha_fin IS NULL OR hae.fecha_inicio <= per.fecha_fin)
+          AND (per.fecha_inicio IS NULL OR hae.fecha_fin IS NULL OR hae.fecha_fin > per.fecha_inicio)
+    )
+    SELECT m.id_estudiante, m.id_aula, e.nombres, e.apellidos, n.id_componente, n.nota
+    FROM mat m
+    JOIN ESTUDIANTE e ON m.id_estudiante = e.id_estudiante
+    LEFT JOIN (
+        SELECT ne.id_nota, ne.id_estudiante, ne.id_componente, ne.nota
+        FROM NOTA_ESTUDIANTE ne
+        JOIN COMPONENTE c ON ne.id_componente = c.id_componente
+        WHERE c.id_periodo = :id_periodo
+    ) n ON n.id_estudiante = m.id_estudiante
+    WHERE m.rn = 1
+    ORDER BY m.id_aula, e.apellidos, e.nombres, m.id_estudiante, n.id_nota
+"""
+
+
+def _cargar(alcance: str, id_alcance: int, id_periodo: int):
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id_componente, nombre, porcentaje
+            FROM COMPONENTE
+            WHERE id_periodo = :1
+            ORDER BY id_componente
+        """, (id_periodo,))
+        componentes = cur.fetchall()
+
+        cur.arraysize = 5000
+        cur.prefetchrows = 5001
+        cur.execute(_SQL_MATRIZ.format(alcance=_ALCANCES[alcance]),
+                    {"id": id_alcance, "id_periodo": id_periodo})
+        filas = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    return componentes, filas
+
+
+# ============================
+# CÁLCULO VECTORIZADO
+# ============================
+
+def calcular(componentes: list, filas: list) -> dict:
+    """
+    Arma la matriz estudiante × componente y calcula definitivas, aprobación
+    y promedios con NumPy. `componentes`: (id, nombre, porcentaje);
+    `filas`: (id_estudiante, id_aula, nombres, apellidos, id_componente, nota).
+    Un componente sin nota cuenta como 0 en la definitiva.
+    """
+    col = {c[0]: j for j, c in enumerate(componentes)}
+
+    estudiantes, fila_de = [], {}
+    idx_est, idx_comp, valores = [], [], []
+    for id_est, id_aula, nombres, apellidos, id_comp, nota in filas:
+        i = fila_de.get(id_est)
+        if i is None:
+            i = fila_de[id_est] = len(estudiantes)
+            estudiantes.append((id_est, id_aula, nombres, apellidos))
+        if id_comp is not None:
+            idx_est.append(i)
+            idx_comp.append(col[id_comp])
+            valores.append(nota)
+
+    n, k = len(estudiantes), len(componentes)
+    notas = np.full((n, k), np.nan)
+    # Asignación con índices repetidos: gana la última (ORDER BY id_nota).
+    notas[np.array(idx_est, dtype=np.intp), np.array(idx_comp, dtype=np.intp)] = valores
+
+    pesos = np.array([c[2] or 0 for c in componentes], dtype=float)
+    total_pesos = pesos.sum()
+    if total_pesos > 0:
+        pesos = pesos / total_pesos
+
+    presentes = ~np.isnan(notas)
+    definitivas = np.round(np.where(presentes, notas, 0.0) @ pesos, 2)
+    aprobados = definitivas >= NOTA_APROBATORIA
+    completos = presentes.all(axis=1)
+
+    # Promedio por componente solo sobre las notas registradas
+    cuenta_comp = presentes.sum(axis=0)
+    suma_comp = np.where(presentes, notas, 0.0).sum(axis=0)
+    prom_comp = np.divide(suma_comp, cuenta_comp, out=np.full(k, np.nan), where=cuenta_comp > 0)
+
+    # Agregados por aula con bincount sobre el índice de aula
+    aulas, idx_aula = np.unique(np.array([e[1] for e in estudiantes], dtype=np.int64), return_inverse=True)
+    por_aula_n = np.bincount(idx_aula, minlength=len(aulas))
+    por_aula_suma = np.bincount(idx_aula, weights=definitivas, minlength=len(aulas))
+    por_aula_aprob = np.bincount(idx_aula, weights=aprobados, minlength=len(aulas))
+
+    ids_comp = [c[0] for c in componentes]
+    notas_lista = np.where(presentes, np.round(notas, 2), np.nan).tolist()
+    defs_lista, aprob_lista, compl_lista = definitivas.tolist(), aprobados.tolist(), completos.tolist()
+
+    return {
+        "componentes": [
+            {"id_componente": c[0], "nombre": c[1], "porcentaje": c[2],
+             "promedio": None if np.isnan(p) else round(float(p), 2), "registradas": int(r)}
+            for c, p, r in zip(componentes, prom_comp, cuenta_comp)
+        ],
+        "estudiantes": [
+            {
+                "id_estudiante": e[0],
+                "id_aula": e[1],
+                "nombres": e[2],
+                "apellidos": e[3],
+                "notas": {idc: (None if v != v else v) for idc, v in zip(ids_comp, notas_lista[i])},
+                "definitiva": defs_lista[i],
+                "aprobado": aprob_lista[i],
+                "completo": compl_lista[i],
+            }
+            for i, e in enumerate(estudiantes)
+        ],
+        "resumen": {
+            "estudiantes": n,
+            "promedio": round(float(definitivas.mean()), 2) if n else None,
+            "aprobados": int(aprobados.sum()),
+            "reprobados": int(n - aprobados.sum()),
+            "nota_aprobatoria": NOTA_APROBATORIA,
+            "por_aula": [
+                {"id_aula": int(a), "estudiantes": int(cnt),
+                 "promedio": round(float(s / cnt), 2), "aprobados": int(ap)}
+                for a, cnt, s, ap in zip(aulas, por_aula_n, por_aula_suma, por_aula_aprob)
+            ],
+        },
+    }
+
+
+def reporte_notas(alcance: str, id_alcance: int, id_periodo: int) -> dict:
+    """
+    Notas definitivas del periodo para un aula, una institución o las aulas
+    activas de un tutor (`alcance` = 'aula' | 'institucion' | 'tutor').
+    """
+    componentes, filas = _cargar(alcance, id_alcance, id_periodo)
+    resultado = calcular(componentes, filas)
+    resultado["id_periodo"] = id_periodo
+    return resultado
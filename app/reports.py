@@ -1,48 +1,19 @@
 # app/reports.py
+from datetime import date
 from app.db import get_conn
-from datetime import time, datetime, date
-
-def _to_str_time(value):
-    """Convierte time/datetime/string a formato 'HH:MM'. Manejo seguro."""
-    if value is None:
-        return ""
-    if isinstance(value, str):
-        return value[:5]  # "HH:MM:SS" → "HH:MM"
-    if isinstance(value, time):
-        return value.strftime("%H:%M")
-    if isinstance(value, datetime):
-        return value.strftime("%H:%M")
-    return ""
-
-
-def _to_str_date(value):
-    """Convierte date/datetime a 'YYYY-MM-DD'."""
-    if value is None:
-        return ""
-    if isinstance(value, date):
-        return value.strftime("%Y-%m-%d")
-    if isinstance(value, datetime):
-        return value.date().strftime("%Y-%m-%d")
-    return ""
+from app.calendario import calendario_festivos
+from app.rows import as_dicts
+from app.cache import report_cache
+from app import intervalos
 
-
-def reporte_asistencia_aula(id_aula: int, id_semana: int | None = None):
-    """
-    Reporte completo de asistencia de un aula.
-    Incluye institución, horario, motivos, festivos y reposiciones.
-    """
-    conn = get_conn()
-    cur = conn.cursor()
-
-    try:
-        sql = """
+# Consulta base compartida por los reportes de asistencia (sync y async).
+_SQL_ASISTENCIA_BASE = """
         SELECT 
             inst.nombre_inst, 
             au.id_aula,
             aa.id_asist,
             aa.fecha_clase,
             aa.hora_inicio,
-            CASE WHEN f.id_festivo IS NOT NULL THEN 'S' ELSE 'N' END AS es_festivo,
             h.dia_semana,
             h.h_inicio,
             h.h_final,
@@ -57,44 +28,298 @@ def reporte_asistencia_aula(id_aula: int, id_semana: int | None = None):
         JOIN AULA au ON aa.id_aula = au.id_aula
         JOIN INSTITUCION inst ON au.id_institucion = inst.id_institucion
 
-        LEFT JOIN FESTIVO f ON CAST(aa.fecha_clase AS DATE) = CAST(f.fecha AS DATE)
-
         LEFT JOIN HORARIO h ON aa.id_horario = h.id_horario
         LEFT JOIN MOTIVO_INASISTENCIA m ON aa.id_motivo = m.id_motivo
         LEFT JOIN ASIGNACION_TUTOR at ON aa.id_tutor_aula = at.id_tutor_aula
+"""
 
-        WHERE au.id_aula = :id_aula
-        """
+_ORDEN_ASISTENCIA = " ORDER BY aa.fecha_clase, aa.hora_inicio"
+
+
+def sql_asistencia_aula(id_aula: int, id_semana: int | None = None):
+    """Arma el SQL y los parámetros del reporte de asistencia de un aula."""
+    sql = _SQL_ASISTENCIA_BASE + " WHERE au.id_aula = :id_aula"
+    params = {"id_aula": id_aula}
+
+    if id_semana:
+        sql += " AND aa.id_semana = :id_semana"
+        params["id_semana"] = id_semana
+
+    return sql + _ORDEN_ASISTENCIA, params
+
+
+def sql_asistencia_tutor(id_persona: int, fecha_inicio: str, fecha_fin: str):
+    """Arma el SQL y los parámetros del reporte de asistencia de un tutor en un rango."""
+    sql = _SQL_ASISTENCIA_BASE + """
+        WHERE at.id_persona = :id_persona
+          AND aa.fecha_clase BETWEEN TO_DATE(:fecha_inicio, 'YYYY-MM-DD')
+                                 AND TO_DATE(:fecha_fin, 'YYYY-MM-DD')
+    """
+    params = {"id_persona": id_persona, "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin}
+    return sql + _ORDEN_ASISTENCIA, params
+
+
+# Totales por semana desde ASISTENCIA_SEMANAL (no toca ASISTENCIA_AULA).
+_SQL_RESUMEN_SEMANAL = """
+        SELECT
+            s.id_aula,
+            s.id_semana,
+            se.numero_semana,
+            se.fecha_inicio,
+            se.fecha_fin,
+            s.id_tutor_aula,
+            at.id_persona AS id_tutor_persona,
+            s.sesiones,
+            s.sesiones_dictadas,
+            s.horas_dictadas,
+            s.reposiciones,
+            s.sesiones_festivo
+        FROM ASISTENCIA_SEMANAL s
+        LEFT JOIN SEMANA se ON s.id_semana = se.id_semana
+        LEFT JOIN ASIGNACION_TUTOR at ON s.id_tutor_aula = at.id_tutor_aula
+"""
 
-        params = {"id_aula": id_aula}
 
-        if id_semana:
-            sql += " AND aa.id_semana = :id_semana"
-            params["id_semana"] = id_semana
+def sql_resumen_semanal(id_aula: int | None = None, id_persona: int | None = None,
+                        fecha_inicio: str | None = None, fecha_fin: str | None = None):
+    """SQL y parámetros del resumen semanal de un aula o de un tutor (rango opcional)."""
+    condiciones, params = [], {}
+    if id_aula is not None:
+        condiciones.append("s.id_aula = :id_aula")
+        params["id_aula"] = id_aula
+    if id_persona is not None:
+        condiciones.append("at.id_persona = :id_persona")
+        params["id_persona"] = id_persona
+    if fecha_inicio:
+        condiciones.append("se.fecha_fin >= TO_DATE(:fecha_inicio, 'YYYY-MM-DD')")
+        params["fecha_inicio"] = fecha_inicio
+    if fecha_fin:
+        condiciones.append("se.fecha_inicio <= TO_DATE(:fecha_fin, 'YYYY-MM-DD')")
+        params["fecha_fin"] = fecha_fin
 
-        sql += " ORDER BY aa.fecha_clase, aa.hora_inicio"
+    sql = _SQL_RESUMEN_SEMANAL
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    return sql + " ORDER BY se.fecha_inicio, s.id_aula, s.id_tutor_aula", params
 
+
+def filas_resumen_semanal(cur):
+    return as_dicts(cur, fechas=("fecha_inicio", "fecha_fin"))
+
+
+# ============================
+# CACHE DE RESULTADOS
+# ============================
+# Claves:
+#   ("asistencia_aula", id_aula, id_semana)
+#   ("asistencia_tutor", id_persona, fecha_inicio, fecha_fin)
+#   ("resumen_semanal", id_aula, id_persona, fecha_inicio, fecha_fin)
+
+def clave_asistencia_aula(id_aula, id_semana):
+    return ("asistencia_aula", id_aula, id_semana)
+
+
+def clave_asistencia_tutor(id_persona, fecha_inicio, fecha_fin):
+    return ("asistencia_tutor", id_persona, fecha_inicio, fecha_fin)
+
+
+def clave_resumen_semanal(id_aula, id_persona, fecha_inicio, fecha_fin):
+    return ("resumen_semanal", id_aula, id_persona, fecha_inicio, fecha_fin)
+
+
+def _fecha(valor):
+    """date de una fecha de clave o de fila ('YYYY-MM-DD', date o datetime); None si no hay."""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, date):  # incluye datetime
+        return date(valor.year, valor.month, valor.day)
+    return date.fromisoformat(str(valor)[:10])
+
+
+def invalidar_asistencia(id_aula, id_semana, id_persona, fecha_clase) -> int:
+    """
+    Elimina solo los reportes que incluyen una fila de ASISTENCIA_AULA con
+    esos datos: los del aula (esa semana o sin filtro de semana), los del
+    tutor cuyo rango contiene la fecha y los resúmenes del aula o del tutor.
+    Las fechas se comparan como date, no como texto.
+    """
+    fecha = _fecha(fecha_clase)
+
+    def en_rango(desde, hasta):
+        try:
+            desde, hasta = _fecha(desde), _fecha(hasta)
+        except ValueError:
+            return True   # clave con fecha ilegible: mejor invalidar de más
+        return (fecha is None
+                or ((desde is None or desde <= fecha) and (hasta is None or fecha <= hasta)))
+
+    def afectado(clave):
+        tipo = clave[0]
+        if tipo == "asistencia_aula":
+            return clave[1] == id_aula and clave[2] in (None, id_semana)
+        if tipo == "asistencia_tutor":
+            return clave[1] == id_persona and en_rango(clave[2], clave[3])
+        if tipo == "resumen_semanal":
+            # sin filtro de aula ni tutor el resumen incluye todas las aulas
+            return clave[1] == id_aula or (clave[1] is None and clave[2] in (None, id_persona))
+        return False
+
+    return report_cache.invalidar_donde(afectado)
+
+
+def filas_asistencia(cur):
+    """
+    Configura el cursor (ya ejecutado) para devolver dicts con fechas y horas
+    normalizadas. es_festivo sale del calendario de festivos en memoria; quien
+    llama lo deja vigente antes de ejecutar (asegurar_vigente() o la carga async).
+    """
+    es_festivo = calendario_festivos.es_festivo
+    return as_dicts(
+        cur,
+        fechas=("fecha_clase", "fecha_reposicion"),
+        horas=("hora_inicio", "h_inicio", "h_final"),
+        vacio="",
+        derivadas={"es_festivo": ("fecha_clase", lambda f: "S" if es_festivo(f) else "N")},
+    )
+
+
+def _ejecutar_reporte(sql, params):
+    conn = get_conn()
+    cur = conn.cursor()
+
+    try:
+        calendario_festivos.asegurar_vigente()
         cur.execute(sql, params)
+        return filas_asistencia(cur).fetchall()
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def reporte_asistencia_aula(id_aula: int, id_semana: int | None = None):
+    """
+    Reporte completo de asistencia de un aula.
+    Incluye institución, horario, motivos, festivos y reposiciones.
+    """
+    clave = clave_asistencia_aula(id_aula, id_semana)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if not encontrado:
+        filas = _ejecutar_reporte(*sql_asistencia_aula(id_aula, id_semana))
+        report_cache.set(clave, filas, generacion)
+    return filas
+
+
+def reporte_asistencia_tutor(id_persona: int, fecha_inicio: str, fecha_fin: str):
+    """
+    Reporte de asistencia de todas las aulas de un tutor entre dos fechas
+    (formato 'YYYY-MM-DD').
+    """
+    clave = clave_asistencia_tutor(id_persona, fecha_inicio, fecha_fin)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if not encontrado:
+        filas = _ejecutar_reporte(*sql_asistencia_tutor(id_persona, fecha_inicio, fecha_fin))
+        report_cache.set(clave, filas, generacion)
+    return filas
+
 
-        rows = cur.fetchall()
-        columns = [col[0].lower() for col in cur.description]
+def reporte_resumen_semanal(id_aula: int | None = None, id_persona: int | None = None,
+                            fecha_inicio: str | None = None, fecha_fin: str | None = None):
+    """Sesiones, horas y reposiciones por semana, leídas de ASISTENCIA_SEMANAL."""
+    clave = clave_resumen_semanal(id_aula, id_persona, fecha_inicio, fecha_fin)
+    generacion = report_cache.generacion()
+    encontrado, filas = report_cache.get(clave)
+    if encontrado:
+        return filas
 
-        result = []
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.execute(*sql_resumen_semanal(id_aula, id_persona, fecha_inicio, fecha_fin))
+        filas = filas_resumen_semanal(cur).fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    report_cache.set(clave, filas, generacion)
+    return filas
 
-        for row in rows:
-            d = dict(zip(columns, row))
 
-            # Normalizar fechas y horas
-            d["fecha_clase"] = _to_str_date(d.get("fecha_clase"))
-            d["fecha_reposicion"] = _to_str_date(d.get("fecha_reposicion"))
-            d["hora_inicio"] = _to_str_time(d.get("hora_inicio"))
-            d["h_inicio"] = _to_str_time(d.get("h_inicio"))
-            d["h_final"] = _to_str_time(d.get("h_final"))
+# ============================
+# AUDITORÍA DE SESIONES
+# ============================
 
-            result.append(d)
+_SQL_AUDITORIA = """
+    SELECT aa.id_asist, aa.id_aula, at.id_persona AS id_tutor_persona, aa.fecha_clase,
+           aa.hora_inicio, aa.hora_fin, h.h_inicio, h.h_final
+    FROM ASISTENCIA_AULA aa
+    LEFT JOIN ASIGNACION_TUTOR at ON aa.id_tutor_aula = at.id_tutor_aula
+    LEFT JOIN HORARIO h ON aa.id_horario = h.id_horario
+    WHERE aa.dictada = 'S'
+      AND aa.fecha_clase >= TO_DATE(:fecha_inicio, 'YYYY-MM-DD')
+      AND aa.fecha_clase < TO_DATE(:fecha_fin, 'YYYY-MM-DD') + 1
+    ORDER BY at.id_persona, aa.fecha_clase, aa.hora_inicio
+"""
 
-        return result
 
+def auditoria_sesiones(fecha_inicio: str, fecha_fin: str) -> dict:
+    """
+    Revisa las clases dictadas del rango con aritmética de franjas por
+    columnas: sesiones sin duración válida, fuera de la franja de su HORARIO
+    y cruces entre sesiones del mismo tutor el mismo día.
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    try:
+        cur.arraysize = 5000
+        cur.execute(_SQL_AUDITORIA, {"fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin})
+        filas = cur.fetchall()
     finally:
         cur.close()
         conn.close()
+
+    if not filas:
+        return {"sesiones": 0, "minutos_dictados": 0, "observaciones": []}
+
+    id_asist, id_aula, persona, fecha, h_ini, h_fin, hor_ini, hor_fin = zip(*filas)
+    ini, fin = intervalos.minutos(h_ini), intervalos.minutos(h_fin)
+    franja_ini, franja_fin = intervalos.minutos(hor_ini), intervalos.minutos(hor_fin)
+
+    # Un grupo por (tutor, día); las filas ya vienen ordenadas así
+    grupos, g, previo = [], -1, None
+    for clave in zip(persona, fecha):
+        if clave != previo:
+            g, previo = g + 1, clave
+        grupos.append(g)
+
+    duracion = intervalos.duraciones(ini, fin).tolist()
+    dentro = intervalos.contenidas(ini, fin, franja_ini, franja_fin).tolist()
+    cruce = intervalos.cruces_consecutivos(grupos, ini, fin).tolist()
+    con_franja = [f is not None for f in hor_ini]
+
+    observaciones = []
+    for k in range(len(filas)):
+        problemas = []
+        if duracion[k] <= 0:
+            problemas.append("SIN_DURACION")
+        if con_franja[k] and not dentro[k]:
+            problemas.append("FUERA_DE_HORARIO")
+        if cruce[k]:
+            problemas.append("CRUCE_TUTOR")
+        if problemas:
+            observaciones.append({
+                "id_asist": id_asist[k],
+                "id_aula": id_aula[k],
+                "id_tutor_persona": persona[k],
+                "fecha_clase": fecha[k].date().isoformat() if fecha[k] else None,
+                "hora_inicio": h_ini[k],
+                "hora_fin": h_fin[k],
+                "problemas": problemas,
+            })
+
+    return {
+        "sesiones": len(filas),
+        "minutos_dictados": int(intervalos.suma_duraciones(ini, fin)),
+        "observaciones": observaciones,
+    }
@@ -0,0 +1,74 @@
+# app/rollups.py
+# Totales semanales de asistencia (ASISTENCIA_SEMANAL), mantenidos por
+# deltas dentro de la misma transacción que escribe ASISTENCIA_AULA.
+# Las funciones reciben el cursor de esa transacción; los SQL no dependen
+# de si el cursor es sync o async.
+
+# Suma (:signo = 1) o resta (:signo = -1) la fila :id_asist tal como está
+# en ASISTENCIA_AULA en ese momento. Para corregir una fila: restar antes
+# del UPDATE y sumar después. id_semana / id_tutor_aula NULL se guardan como 0.
+SQL_ACUMULAR = """
+    MERGE INTO ASISTENCIA_SEMANAL s
+    USING (
+        SELECT aa.id_aula,
+               NVL(aa.id_semana, 0)     AS id_semana,
+               NVL(aa.id_tutor_aula, 0) AS id_tutor_aula,
+               :signo                                                      AS sesiones,
+               :signo * CASE WHEN aa.dictada = 'S' THEN 1 ELSE 0 END       AS sesiones_dictadas,
+               :signo * NVL(aa.horas_dictadas, 0)                          AS horas_dictadas,
+               :signo * CASE WHEN aa.reposicion = 'S' THEN 1 ELSE 0 END    AS reposiciones,
+               :signo * NVL(aa.es_festivo, 0)                              AS sesiones_festivo
+        FROM ASISTENCIA_AULA aa
+        WHERE aa.id_asist = :id_asist
+    ) d
+    ON (s.id_aula = d.id_aula AND s.id_semana = d.id_semana AND s.id_tutor_aula = d.id_tutor_aula)
+    WHEN MATCHED THEN UPDATE SET
+        s.sesiones          = s.sesiones + d.sesiones,
+        s.sesiones_dictadas = s.sesiones_dictadas + d.sesiones_dictadas,
+        s.horas_dictadas    = s.horas_dictadas + d.horas_dictadas,
+        s.reposiciones      = s.reposiciones + d.reposiciones,
+        s.sesiones_festivo  = s.sesiones_festivo + d.sesiones_festivo,
+        s.actualizado_en    = SYSDATE
+    WHEN NOT MATCHED THEN INSERT (
+        id_aula, id_semana, id_tutor_aula, sesiones, sesiones_dictadas,
+        horas_dictadas, reposiciones, sesiones_festivo, actualizado_en
+    ) VALUES (
+        d.id_aula, d.id_semana, d.id_tutor_aula, d.sesiones, d.sesiones_dictadas,
+        d.horas_dictadas, d.reposiciones, d.sesiones_festivo, SYSDATE
+    )
+"""
+
+_SQL_RECONSTRUIR = """
+    INSERT INTO ASISTENCIA_SEMANAL (
+        id_aula, id_semana, id_tutor_aula, sesiones, sesiones_dictadas,
+        horas_dictadas, reposiciones, sesiones_festivo, actualizado_en
+    )
+    SELECT aa.id_aula, NVL(aa.id_semana, 0), NVL(aa.id_tutor_aula, 0),
+           COUNT(*),
+           SUM(CASE WHEN aa.dictada = 'S' THEN 1 ELSE 0 END),
+           SUM(NVL(aa.horas_dictadas, 0)),
+           SUM(CASE WHEN aa.reposicion = 'S' THEN 1 ELSE 0 END),
+           SUM(NVL(aa.es_festivo, 0)),
+           SYSDATE
+    FROM ASISTENCIA_AULA aa
+    {filtro}
+    GROUP BY aa.id_aula, NVL(aa.id_semana, 0), NVL(aa.id_tutor_aula, 0)
+"""
+
+
+def params_acumular(id_asist: int, signo: int = 1) -> dict:
+    return {"id_asist": id_asist, "signo": signo}
+
+
+def reconstruir(cur, id_semana: int | None = None) -> int:
+    """
+    Recalcula ASISTENCIA_SEMANAL desde ASISTENCIA_AULA (completa o solo una
+    semana). No hace commit. Retorna el número de filas escritas.
+    """
+    if id_semana is None:
+        cur.execute("DELETE FROM ASISTENCIA_SEMANAL")
+        cur.execute(_SQL_RECONSTRUIR.format(filtro=""))
+    else:
+        cur.execute("DELETE FROM ASISTENCIA_SEMANAL WHERE id_semana = :1", (id_semana,))
+        cur.execute(_SQL_RECONSTRUIR.format(filtro="WHERE NVL(aa.id_semana, 0) = :1"), (id_semana,))
+    return cur.rowcount
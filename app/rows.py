@@ -0,0 +1,90 @@
+# app/rows.py
+import oracledb
+
+# ============================================================
+# MAPEO DE FILAS (cursor.rowfactory)
+# ============================================================
+# Se configura una vez por consulta, después de execute(): los nombres de
+# columna y la conversión de cada columna se resuelven con cur.description,
+# y por fila solo queda aplicar funciones ya elegidas.
+
+_TIPOS_FECHA = (oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP)
+
+
+def columnas(cur) -> tuple:
+    """Nombres de columna en minúscula del último execute()."""
+    return tuple(col[0].lower() for col in cur.description)
+
+
+def _conv_fecha(tipo, vacio):
+    if tipo in _TIPOS_FECHA:
+        return lambda v: v.isoformat()[:10] if v is not None else vacio
+    return lambda v: str(v)[:10] if v is not None else vacio
+
+
+def _conv_hora(tipo, vacio):
+    if tipo in _TIPOS_FECHA:
+        return lambda v: v.strftime("%H:%M") if v is not None else vacio
+    return lambda v: v[:5] if v is not None else vacio   # VARCHAR2 'HH:MM[:SS]'
+
+
+def _conversiones(cur, fechas, horas, vacio):
+    conv = []
+    for i, col in enumerate(cur.description):
+        nombre = col[0].lower()
+        if nombre in fechas:
+            conv.append((i, _conv_fecha(col.type_code, vacio)))
+        elif nombre in horas:
+            conv.append((i, _conv_hora(col.type_code, vacio)))
+    return conv
+
+
+def as_dicts(cur, fechas=(), horas=(), vacio=None, derivadas=None):
+    """
+    Hace que el cursor devuelva dicts {columna: valor}.
+
+    - fechas / horas: columnas a normalizar a 'YYYY-MM-DD' / 'HH:MM'
+      (NULL → `vacio`); la función se elige según el tipo de la columna.
+    - derivadas: {nueva_columna: (columna_origen, fn)} calculadas con el
+      valor crudo de la columna origen.
+    """
+    nombres = columnas(cur)
+    conv = _conversiones(cur, fechas, horas, vacio)
+    extra = [(nuevo, nombres.index(origen), fn) for nuevo, (origen, fn) in (derivadas or {}).items()]
+
+    if not conv and not extra:
+        def factory(*row):
+            return dict(zip(nombres, row))
+    else:
+        def factory(*row):
+            d = dict(zip(nombres, row))
+            for nuevo, i, fn in extra:
+                d[nuevo] = fn(row[i])
+            for i, fn in conv:
+                d[nombres[i]] = fn(row[i])
+            return d
+
+    cur.rowfactory = factory
+    return cur
+
+
+def as_tuples(cur, por_tipo=None):
+    """
+    Hace que el cursor devuelva tuplas, sin dict por fila: para salidas que
+    no necesitan objetos (CSV, cálculos por columna). `por_tipo` es
+    {type_code: fn} y se resuelve una vez por columna; sin conversiones el
+    cursor queda con sus tuplas nativas. Retorna los nombres de columna.
+    """
+    nombres = columnas(cur)
+    conv = [(i, por_tipo[col.type_code]) for i, col in enumerate(cur.description)
+            if por_tipo and col.type_code in por_tipo]
+
+    if conv:
+        def factory(*row):
+            row = list(row)
+            for i, fn in conv:
+                if row[i] is not None:
+                    row[i] = fn(row[i])
+            return tuple(row)
+        cur.rowfactory = factory
+    return nombres
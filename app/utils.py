@@ -1,6 +1,9 @@
 # app/utils.py
 
+import base64
+import json
 from datetime import datetime, timedelta, time
+from functools import lru_cache
 
 # ============================================================
 # 1. CONVERSIÓN DE MINUTOS A EQUIVALENTES
@@ -22,42 +25,122 @@ def minutes_to_equivalents(minutes: int | float, minutos_equiv: int) -> float:
 # ============================================================
 # 2. PARSEO DE FECHAS Y HORAS
 # ============================================================
+# Rutas rápidas: ISO con fromisoformat, 'HH:MM[:SS]' por posición y
+# memoización por valor (las planillas repiten mucho las mismas fechas).
+# Si no aplican, se prueban los formatos con strptime empezando por el
+# último que funcionó.
+
+FORMATOS_FECHA = (
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+)
+FORMATOS_HORA = ("%H:%M", "%H:%M:%S")
+
+_ultimo_formato_fecha = 0
+_ultimo_formato_hora = 0
+
+
+def _es_iso(value: str) -> bool:
+    """¿Tiene la forma de alguno de los formatos ISO aceptados (con ceros a la izquierda)?"""
+    n = len(value)
+    if n < 10 or value[4] != "-" or value[7] != "-":
+        return False
+    if n == 10:
+        return True
+    if n == 16:
+        return value[10] in " T" and value[13] == ":"
+    return n == 19 and value[10] == "T" and value[13] == ":" and value[16] == ":"
+
+
+def _strptime_memo(value: str, formatos: tuple, ultimo: int):
+    """strptime probando primero formatos[ultimo]; retorna (datetime, índice) o (None, ultimo)."""
+    try:
+        return datetime.strptime(value, formatos[ultimo]), ultimo
+    except ValueError:
+        pass
+    for i, fmt in enumerate(formatos):
+        if i == ultimo:
+            continue
+        try:
+            return datetime.strptime(value, fmt), i
+        except ValueError:
+            pass
+    return None, ultimo
+
+
+@lru_cache(maxsize=8192)
 def parse_datetime(value: str) -> datetime:
     """
     Convierte un string a datetime. Acepta varios formatos comunes.
     """
-    formatos = [
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d",
-        "%d/%m/%Y",
-        "%d-%m-%Y",
-        "%Y/%m/%d",
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%dT%H:%M"
-    ]
-
-    for fmt in formatos:
+    global _ultimo_formato_fecha
+
+    if _es_iso(value):
         try:
-            return datetime.strptime(value, fmt)
+            return datetime.fromisoformat(value)
         except ValueError:
             pass
 
-    raise ValueError(f"No se reconoce el formato de fecha: {value}")
+    resultado, _ultimo_formato_fecha = _strptime_memo(value, FORMATOS_FECHA, _ultimo_formato_fecha)
+    if resultado is None:
+        raise ValueError(f"No se reconoce el formato de fecha: {value}")
+    return resultado
 
 
+@lru_cache(maxsize=4096)
 def parse_time(value: str) -> time:
     """
     Convierte un string HH:MM o HH:MM:SS a time.
     """
-    formatos = ["%H:%M", "%H:%M:%S"]
-
-    for fmt in formatos:
+    global _ultimo_formato_hora
+
+    n = len(value)
+    if (n == 5 or (n == 8 and value[5] == ":")) and value[2] == ":":
+        hh, mm = value[0:2], value[3:5]
+        ss = value[6:8] if n == 8 else "00"
+        if hh.isdigit() and mm.isdigit() and ss.isdigit():
+            try:
+                return time(int(hh), int(mm), int(ss))
+            except ValueError:
+                pass  # fuera de rango: que falle abajo con el mensaje de siempre
+
+    resultado, _ultimo_formato_hora = _strptime_memo(value, FORMATOS_HORA, _ultimo_formato_hora)
+    if resultado is None:
+        raise ValueError(f"Formato de hora no válido: {value}")
+    return resultado.time()
+
+
+def _parse_lote(values, parser, estricto: bool) -> list:
+    resultado = []
+    for v in values:
+        if v is None or v == "":
+            resultado.append(None)
+            continue
         try:
-            return datetime.strptime(value, fmt).time()
+            resultado.append(parser(v))
         except ValueError:
-            pass
+            if estricto:
+                raise
+            resultado.append(None)
+    return resultado
+
+
+def parse_datetimes(values, estricto: bool = True) -> list:
+    """
+    parse_datetime sobre una columna completa. Vacíos → None; con
+    estricto=False los valores inválidos también quedan en None.
+    """
+    return _parse_lote(values, parse_datetime, estricto)
+
 
-    raise ValueError(f"Formato de hora no válido: {value}")
+def parse_times(values, estricto: bool = True) -> list:
+    """Igual que parse_datetimes, para columnas de horas."""
+    return _parse_lote(values, parse_time, estricto)
 
 
 # ============================================================
@@ -73,10 +156,10 @@ def calc_minutes_between(hora_inicio: str | time, hora_final: str | time) -> int
     if isinstance(hora_final, str):
         hora_final = parse_time(hora_final)
 
-    dt1 = datetime.combine(datetime.today(), hora_inicio)
-    dt2 = datetime.combine(datetime.today(), hora_final)
-
-    return int((dt2 - dt1).total_seconds() / 60)
+    segundos = ((hora_final.hour - hora_inicio.hour) * 3600
+                + (hora_final.minute - hora_inicio.minute) * 60
+                + (hora_final.second - hora_inicio.second))
+    return int(segundos / 60)
 
 
 # ============================================================
@@ -90,6 +173,9 @@ def format_time(value: time | str | None) -> str:
         return ""
 
     if isinstance(value, str):
+        if len(value) == 5 and value[2] == ":" and value[:2].isdigit() and value[3:].isdigit() \
+                and value < "24" and value[3] < "6":
+            return value  # ya está en HH:MM
         try:
             value = parse_time(value)
         except ValueError:
@@ -113,3 +199,41 @@ def in_range(date_value: datetime | str, start: datetime | str, end: datetime |
         end = parse_datetime(end)
 
     return start <= date_value <= end
+
+
+# ============================================================
+# 6. CURSORES OPACOS DE PAGINACIÓN (KEYSET)
+# ============================================================
+def encode_cursor(key) -> str:
+    """
+    Codifica la clave de la última fila de una página (int, str o lista)
+    como un cursor opaco apto para URL.
+    """
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _tiene_forma(valor, forma) -> bool:
+    if isinstance(forma, tuple):
+        return (isinstance(valor, list) and len(valor) == len(forma)
+                and all(_tiene_forma(v, f) for v, f in zip(valor, forma)))
+    return isinstance(valor, forma) and not isinstance(valor, bool)
+
+
+def decode_cursor(cursor: str | None, forma=None):
+    """
+    Inverso de encode_cursor. Retorna None si no hay cursor.
+    `forma` es el tipo esperado de la clave (int, str) o una tupla de tipos
+    para claves compuestas, p. ej. (int, int); si no coincide lanza ValueError.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        clave = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise ValueError(f"Cursor de paginación inválido: {cursor}")
+    if forma is not None and not _tiene_forma(clave, forma):
+        raise ValueError(f"Cursor de paginación inválido: {cursor}")
+    return clave
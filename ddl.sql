@@ -1,3 +1,6 @@
+DROP TABLE LIBRO_HORAS_TUTOR CASCADE CONSTRAINTS;
+DROP TABLE LIBRO_HORAS_PENDIENTE CASCADE CONSTRAINTS;
+DROP TABLE ASISTENCIA_SEMANAL CASCADE CONSTRAINTS;
 DROP TABLE ASISTENCIA_ESTUDIANTE CASCADE CONSTRAINTS;
 DROP TABLE ASISTENCIA_AULA CASCADE CONSTRAINTS;
 DROP TABLE HISTORICO_AULA_ESTUDIANTE CASCADE CONSTRAINTS;
@@ -17,36 +20,81 @@ DROP TABLE INSTITUCION CASCADE CONSTRAINTS;
 DROP TABLE PERIODO CASCADE CONSTRAINTS;
 DROP TABLE COMPONENTE CASCADE CONSTRAINTS;
 DROP TABLE TUTOR_AULA CASCADE CONSTRAINTS;
+DROP TABLE TUTOR_AULA_ACTIVO CASCADE CONSTRAINTS;
+DROP TABLE ROL CASCADE CONSTRAINTS;
+DROP TABLE TIPO_DOCUMENTO CASCADE CONSTRAINTS;
+DROP TABLE VERSION_TABLA CASCADE CONSTRAINTS;
 
 
 CREATE TABLE INSTITUCION (
   id_institucion    NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
-  nombre_inst       VARCHAR2(200) NOT NULL UNIQUE,
+  nombre_inst       VARCHAR2(200) NOT NULL,
   jornada           VARCHAR2(20) NOT NULL,
   dir_principal     VARCHAR2(400) NOT NULL
 );
 
+-- Unicidad sin distinguir mayúsculas (crud.py traduce ORA-00001 por nombre de índice)
+CREATE UNIQUE INDEX UX_INSTITUCION_NOMBRE ON INSTITUCION (LOWER(nombre_inst));
+
 
 CREATE TABLE SEDE (
   id_institucion    NUMBER NOT NULL,
   id_sede           NUMBER NOT NULL,
-  direccion         VARCHAR2(400) NOT NULL UNIQUE,
+  direccion         VARCHAR2(400) NOT NULL,
   es_principal      CHAR(1)  DEFAULT 'N' NOT NULL,
   CONSTRAINT pk_sede PRIMARY KEY (id_institucion, id_sede),
   CONSTRAINT fk_sede_institucion FOREIGN KEY (id_institucion) REFERENCES INSTITUCION(id_institucion)
 );
 
+CREATE UNIQUE INDEX UX_SEDE_DIRECCION ON SEDE (LOWER(direccion));
+
+
+-- Catálogos de referencia (GET /roles, GET /tipo-documento). PERSONA guarda
+-- el nombre del rol y el tipo de documento como texto.
+CREATE TABLE ROL (
+  id_rol            NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  nombre            VARCHAR2(20) NOT NULL UNIQUE,
+  descripcion       VARCHAR2(400)
+);
+
+INSERT INTO ROL (nombre, descripcion) VALUES ('ADMINISTRADOR', 'Configuración del sistema y usuarios');
+INSERT INTO ROL (nombre, descripcion) VALUES ('ADMINISTRATIVO', 'Gestión académica y reportes');
+INSERT INTO ROL (nombre, descripcion) VALUES ('TUTOR', 'Registro de asistencia y notas');
+
+CREATE TABLE TIPO_DOCUMENTO (
+  id_tipo_doc       NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  nombre_tipo       VARCHAR2(100) NOT NULL,
+  sigla             VARCHAR2(10) NOT NULL UNIQUE
+);
+
+-- Versión de las tablas de referencia, base del ETag de sus listados
+-- (main._condicional). crud.py la sube en la misma transacción de cada
+-- escritura, y quien escriba estas tablas por fuera de la API también debe
+-- subirla. modificado_en va en UTC.
+CREATE TABLE VERSION_TABLA (
+  tabla             VARCHAR2(30) PRIMARY KEY,
+  version           NUMBER DEFAULT 0 NOT NULL,
+  modificado_en     TIMESTAMP DEFAULT SYS_EXTRACT_UTC(SYSTIMESTAMP) NOT NULL
+);
+
+INSERT INTO VERSION_TABLA (tabla)
+SELECT column_value FROM TABLE(sys.odcivarchar2list('ROL', 'TIPO_DOCUMENTO', 'INSTITUCION', 'SEDE', 'AULA'))
+WHERE column_value NOT IN (SELECT tabla FROM VERSION_TABLA);
+
 
 CREATE TABLE PERSONA (
   id_persona        NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
   tipo_doc          VARCHAR2(20) NOT NULL,
-  num_documento     VARCHAR2(50) UNIQUE NOT NULL,
+  num_documento     VARCHAR2(50) NOT NULL,
   nombre            VARCHAR2(250) NOT NULL,
   telefono          VARCHAR2(50),
-  correo            VARCHAR2(200) UNIQUE NOT NULL,
+  correo            VARCHAR2(200) NOT NULL,
   rol               VARCHAR2(20) NOT NULL
 );
 
+CREATE UNIQUE INDEX UX_PERSONA_DOCUMENTO ON PERSONA (LOWER(num_documento));
+CREATE UNIQUE INDEX UX_PERSONA_CORREO ON PERSONA (LOWER(correo));
+
 
 CREATE TABLE USUARIO (
   nombre_user       VARCHAR2(100) PRIMARY KEY,
@@ -64,6 +112,8 @@ CREATE TABLE ASIGNACION_TUTOR (
   CONSTRAINT fk_at_persona FOREIGN KEY (id_persona) REFERENCES PERSONA(id_persona)
 );
 
+CREATE INDEX IX_AT_PERSONA_FIN ON ASIGNACION_TUTOR (id_persona, fecha_fin);
+
 
 INSERT INTO USUARIO (nombre_user, contrasena, id_persona)
 VALUES ('ana.admin',
@@ -91,6 +141,22 @@ CREATE TABLE TUTOR_AULA (
       REFERENCES AULA(id_aula)
 );
 
+CREATE INDEX IX_TUTOR_AULA_AULA ON TUTOR_AULA (id_aula, id_tutor_aula);
+
+-- Estado actual (aula → tutor activo), mantenido por crud.asignar_tutor_aula /
+-- remover_tutor_de_aula y reconstruible desde el histórico con
+-- crud.verificar_asignaciones_activas(reparar=True).
+CREATE TABLE TUTOR_AULA_ACTIVO (
+  id_aula           NUMBER PRIMARY KEY,
+  id_tutor_aula     NUMBER NOT NULL UNIQUE,
+  id_persona        NUMBER NOT NULL,
+  fecha_inicio      DATE NOT NULL,
+  CONSTRAINT fk_taa_aula FOREIGN KEY (id_aula) REFERENCES AULA(id_aula),
+  CONSTRAINT fk_taa_asignacion FOREIGN KEY (id_tutor_aula) REFERENCES ASIGNACION_TUTOR(id_tutor_aula)
+);
+
+CREATE INDEX IX_TAA_PERSONA ON TUTOR_AULA_ACTIVO (id_persona);
+
 CREATE TABLE HORARIO (
   id_horario        NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
   dia_semana        VARCHAR2(10),
@@ -111,6 +177,9 @@ CREATE TABLE HISTORICO_HORARIO_AULA (
   CONSTRAINT fk_hha_horario FOREIGN KEY (id_horario) REFERENCES HORARIO(id_horario)
 );
 
+-- Horarios activos de un aula: WHERE id_aula = :1 AND fecha_fin IS NULL
+CREATE INDEX IX_HHA_AULA_FIN ON HISTORICO_HORARIO_AULA (id_aula, fecha_fin);
+
 
 CREATE TABLE ESTUDIANTE (
   id_estudiante     NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -136,6 +205,10 @@ CREATE TABLE HISTORICO_AULA_ESTUDIANTE (
   CONSTRAINT fk_hae_aula FOREIGN KEY (id_aula) REFERENCES AULA(id_aula)
 );
 
+-- Consultas "estudiantes del aula X en la fecha D" (as-of)
+CREATE INDEX IX_HAE_AULA_FECHAS ON HISTORICO_AULA_ESTUDIANTE (id_aula, fecha_inicio, fecha_fin);
+CREATE INDEX IX_HAE_ESTUDIANTE_FIN ON HISTORICO_AULA_ESTUDIANTE (id_estudiante, fecha_fin);
+
 
 CREATE TABLE MOTIVO_INASISTENCIA (
   id_motivo         NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -182,6 +255,50 @@ CREATE TABLE ASISTENCIA_AULA (
 );
 
 
+-- Totales semanales de ASISTENCIA_AULA (app/rollups.py), se actualiza en la
+-- misma transacción que registra/corrige asistencia.
+-- id_semana / id_tutor_aula = 0 cuando la fila de origen los tiene en NULL.
+CREATE TABLE ASISTENCIA_SEMANAL (
+  id_aula           NUMBER NOT NULL,
+  id_semana         NUMBER NOT NULL,
+  id_tutor_aula     NUMBER NOT NULL,
+  sesiones          NUMBER DEFAULT 0 NOT NULL,
+  sesiones_dictadas NUMBER DEFAULT 0 NOT NULL,
+  horas_dictadas    NUMBER DEFAULT 0 NOT NULL,
+  reposiciones      NUMBER DEFAULT 0 NOT NULL,
+  sesiones_festivo  NUMBER DEFAULT 0 NOT NULL,
+  actualizado_en    DATE,
+  CONSTRAINT pk_asistencia_semanal PRIMARY KEY (id_aula, id_semana, id_tutor_aula)
+);
+
+CREATE INDEX IX_AS_TUTOR_SEMANA ON ASISTENCIA_SEMANAL (id_tutor_aula, id_semana);
+
+
+-- Libro de horas de tutores para nómina (app/nomina.py): una fila por
+-- tutor, aula y día con clases dictadas.
+CREATE TABLE LIBRO_HORAS_TUTOR (
+  id_persona         NUMBER NOT NULL,
+  id_aula            NUMBER NOT NULL,
+  fecha              DATE NOT NULL,
+  sesiones           NUMBER DEFAULT 0 NOT NULL,
+  horas_dictadas     NUMBER DEFAULT 0 NOT NULL,
+  minutos_reales     NUMBER DEFAULT 0 NOT NULL,
+  horas_equivalentes NUMBER(10,2) DEFAULT 0 NOT NULL,
+  actualizado_en     DATE,
+  CONSTRAINT pk_libro_horas_tutor PRIMARY KEY (id_persona, id_aula, fecha)
+);
+
+CREATE INDEX IX_LHT_FECHA ON LIBRO_HORAS_TUTOR (fecha, id_persona);
+
+-- Días con asistencia registrada/corregida aún no recalculados en el libro.
+CREATE TABLE LIBRO_HORAS_PENDIENTE (
+  fecha             DATE PRIMARY KEY,
+  marcado_en        DATE
+);
+
+CREATE INDEX IX_AA_FECHA_CLASE ON ASISTENCIA_AULA (fecha_clase);
+
+
 CREATE TABLE ASISTENCIA_ESTUDIANTE (
   id_asist_est      NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
   id_asist          NUMBER NOT NULL,
@@ -219,3 +336,6 @@ CREATE TABLE NOTA_ESTUDIANTE (
   CONSTRAINT fk_ne_est FOREIGN KEY (id_estudiante) REFERENCES ESTUDIANTE(id_estudiante),
   CONSTRAINT fk_ne_componente FOREIGN KEY (id_componente) REFERENCES COMPONENTE(id_componente)
 );
+
+CREATE INDEX IX_NE_ESTUDIANTE_COMP ON NOTA_ESTUDIANTE (id_estudiante, id_componente, nota);
+CREATE INDEX IX_COMPONENTE_PERIODO ON COMPONENTE (id_periodo);
@@ -0,0 +1,128 @@
+# scripts/migrate_schema.py
+# Lleva una base creada con una versión anterior de ddl.sql a la actual sin
+# borrar datos. Se puede correr varias veces:
+#   1. Quita los UNIQUE de columna de INSTITUCION.nombre_inst, SEDE.direccion,
+#      PERSONA.num_documento y PERSONA.correo (los reemplazan los índices
+#      UX_* sobre LOWER(...)).
+#   2. Crea las tablas e índices de ddl.sql que falten (ignora los que ya
+#      existen), carga los roles de ddl.sql si ROL está vacía y agrega a
+#      VERSION_TABLA las tablas que falten.
+#   3. Llena TUTOR_AULA_ACTIVO desde el histórico de asignaciones.
+#   4. Reconstruye ASISTENCIA_SEMANAL y LIBRO_HORAS_TUTOR.
+#
+#   python scripts/migrate_schema.py
+import os
+import re
+import sys
+import oracledb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app import rollups, nomina  # noqa: E402
+
+USER = os.getenv("DB_USER", "GLOBALENGLISH")
+PASSWORD = os.getenv("DB_PASS", "oracle")
+DSN = os.getenv("DB_DSN", "localhost:1522/XEPDB1")
+
+DDL_FILE = os.path.join(os.path.dirname(__file__), "..", "ddl.sql")
+
+# (tabla, columna) cuyo UNIQUE de columna pasa a ser un índice UX_* en LOWER()
+UNIQUES_REEMPLAZADOS = [
+    ("INSTITUCION", "NOMBRE_INST"),
+    ("SEDE", "DIRECCION"),
+    ("PERSONA", "NUM_DOCUMENTO"),
+    ("PERSONA", "CORREO"),
+]
+
+# ORA-00955: el nombre ya existe; ORA-01408: la lista de columnas ya tiene índice
+_YA_EXISTE = (955, 1408)
+
+_SQL_TUTOR_AULA_ACTIVO = """
+    INSERT INTO TUTOR_AULA_ACTIVO (id_aula, id_tutor_aula, id_persona, fecha_inicio)
+    SELECT id_aula, id_tutor_aula, id_persona, fecha_inicio
+    FROM (
+        SELECT ta.id_aula, at.id_tutor_aula, at.id_persona, at.fecha_inicio,
+               ROW_NUMBER() OVER (PARTITION BY ta.id_aula
+                                  ORDER BY at.fecha_inicio DESC, at.id_tutor_aula DESC) AS rn
+        FROM TUTOR_AULA ta
+        JOIN ASIGNACION_TUTOR at ON ta.id_tutor_aula = at.id_tutor_aula
+        WHERE at.fecha_fin IS NULL
+    )
+    WHERE rn = 1
+      AND id_aula NOT IN (SELECT id_aula FROM TUTOR_AULA_ACTIVO)
+"""
+
+
+def quitar_uniques(cur):
+    for tabla, columna in UNIQUES_REEMPLAZADOS:
+        cur.execute("""
+            SELECT c.constraint_name
+            FROM USER_CONSTRAINTS c
+            JOIN USER_CONS_COLUMNS cc ON c.constraint_name = cc.constraint_name
+            WHERE c.table_name = :1 AND c.constraint_type = 'U'
+            GROUP BY c.constraint_name
+            HAVING COUNT(*) = 1 AND MAX(cc.column_name) = :2
+        """, (tabla, columna))
+        for (nombre,) in cur.fetchall():
+            print(f"  {tabla}.{columna}: DROP CONSTRAINT {nombre}")
+            cur.execute(f"ALTER TABLE {tabla} DROP CONSTRAINT {nombre} DROP INDEX")
+
+
+def sentencias(patron: str):
+    """Sentencias de ddl.sql que empiezan con `patron` (regex), en orden y sin comentarios."""
+    with open(DDL_FILE, "r", encoding="utf-8") as f:
+        ddl = f.read()
+    for s in ddl.split(";"):
+        s = "\n".join(l for l in s.splitlines() if not l.strip().startswith("--")).strip()
+        if re.match(patron, s, re.IGNORECASE):
+            yield s
+
+
+def crear_faltantes(cur):
+    for s in sentencias(r"CREATE\s+(TABLE|INDEX|UNIQUE\s+INDEX)\b"):
+        try:
+            cur.execute(s)
+            print("  creado:", s.splitlines()[0][:80])
+        except oracledb.DatabaseError as e:
+            if e.args[0].code not in _YA_EXISTE:
+                print("  ERROR:", s.splitlines()[0][:80])
+                raise
+
+    cur.execute("SELECT COUNT(*) FROM ROL")
+    if cur.fetchone()[0] == 0:
+        for s in sentencias(r"INSERT\s+INTO\s+ROL\b"):
+            cur.execute(s)
+        print("  roles iniciales cargados")
+
+    for s in sentencias(r"INSERT\s+INTO\s+VERSION_TABLA\b"):
+        cur.execute(s)
+        if cur.rowcount:
+            print(f"  VERSION_TABLA: {cur.rowcount} tablas agregadas")
+
+
+def main():
+    conn = oracledb.connect(user=USER, password=PASSWORD, dsn=DSN)
+    cur = conn.cursor()
+    try:
+        print("1. UNIQUE de columna reemplazados por índices UX_*")
+        quitar_uniques(cur)
+        print("2. Tablas e índices nuevos")
+        crear_faltantes(cur)      # DDL: cada sentencia hace commit implícito
+
+        print("3. TUTOR_AULA_ACTIVO")
+        cur.execute(_SQL_TUTOR_AULA_ACTIVO)
+        print(f"  {cur.rowcount} aulas con tutor activo agregadas")
+        print("4. Rollups")
+        print(f"  ASISTENCIA_SEMANAL: {rollups.reconstruir(cur)} filas")
+        print(f"  LIBRO_HORAS_TUTOR: {nomina.reconstruir(cur)} filas")
+        conn.commit()
+        print("Migración terminada.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# scripts/rebuild_asistencia_semanal.py
+# Recalcula la tabla ASISTENCIA_SEMANAL desde ASISTENCIA_AULA.
+#   python scripts/rebuild_asistencia_semanal.py            # todas las semanas
+#   python scripts/rebuild_asistencia_semanal.py 12         # solo id_semana 12
+import os
+import sys
+import oracledb
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.rollups import reconstruir  # noqa: E402
+
+USER = os.getenv("DB_USER", "GLOBALENGLISH")
+PASSWORD = os.getenv("DB_PASS", "oracle")
+DSN = os.getenv("DB_DSN", "localhost:1522/XEPDB1")
+
+
+def main():
+    id_semana = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    conn = oracledb.connect(user=USER, password=PASSWORD, dsn=DSN)
+    cur = conn.cursor()
+    try:
+        filas = reconstruir(cur, id_semana)
+        conn.commit()
+        print(f"ASISTENCIA_SEMANAL reconstruida ({filas} filas).")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -201,6 +201,13 @@ def main():
         festivos,
     )
 
+    # Los listados de referencia usan VERSION_TABLA como ETag
+    cur.execute("""
+        UPDATE VERSION_TABLA
+        SET version = version + 1, modificado_en = SYS_EXTRACT_UTC(SYSTIMESTAMP)
+        WHERE tabla IN ('INSTITUCION', 'SEDE', 'AULA')
+    """)
+
     conn.commit()
     cur.close()
     conn.close()